@@ -1,6 +1,15 @@
 import reflex as rx
-from .backend.proposal_state import ProposalState
+from typing import Any, Dict, List
+from .backend.proposal_state import ProposalState, PROPOSAL_FILTERS
 from .backend.wallet_state import WalletState
+from .backend.integration import get_web3, get_dao_contract, get_token_contract
+from .backend.indexer import run_indexer
+from .backend.async_integration import async_web3_lifespan
+from .backend.fees import run_fee_oracle
+from .backend.subscriber import run_subscriber
+from .backend.deadlines import run_deadline_scheduler
+from .backend.metrics import mount as mount_metrics
+from .backend.export import mount as mount_export
 
 
 def create_h3_heading(text):
@@ -70,7 +79,7 @@ def create_voting_buttons(proposal_id):
     )
 
 
-def create_execute_button(proposal_id, executed):
+def create_execute_button(proposal_id, executed, blocked):
     return rx.el.button(
         rx.cond(
             executed,
@@ -91,8 +100,9 @@ def create_execute_button(proposal_id, executed):
         disabled=rx.cond(
             executed,
             True,  # Disabled if executed
-            False,  # Enabled if not
+            blocked != "",  # Disabled if the transaction would revert
         ),
+        title=blocked,
     )
 
 
@@ -151,29 +161,62 @@ def create_proposal_box(prop: dict):
     and, opcionalmente, an 'Execute Proposal' button se ainda não foi executado.
     """
     proposal_id = prop["id"]
-    executed = prop["executed"]
-    title = prop["title"]
-    description = prop["description"]
+    executed = ProposalState.proposal_status[proposal_id.to_string()]["executed"]
+    # The voting period is over, pushed by the deadline scheduler when it passes
+    ended = ProposalState.proposal_status[proposal_id.to_string()]["ended"]
+    # A transaction from this session on the proposal is waiting for its receipt
+    pending = ProposalState.proposal_status[proposal_id.to_string()]["pending"]
+    # Full title and description are only loaded once the proposal is expanded
+    expanded = ProposalState.details.contains(proposal_id.to_string())
+    detail = ProposalState.details[proposal_id.to_string()]
+    title = rx.cond(expanded, detail["title"], prop["title"])
+    # Why voting or executing would revert for the connected wallet, "" when it would not
+    simulated = ProposalState.verdicts.contains(proposal_id.to_string())
+    verdict = ProposalState.verdicts[proposal_id.to_string()]
+    vote_blocked = rx.cond(simulated, verdict["vote"], "")
+    execute_blocked = rx.cond(simulated, verdict["execute"], "")
 
     proposal_title = create_h3_heading(text=f"Proposal #{proposal_id}: {title}")
-    proposal_desc = create_paragraph(text=description)
+    proposal_desc = rx.cond(expanded, create_paragraph(text=detail["description"]))
+    details_button = rx.button(
+        rx.cond(expanded, "Hide details", "Show details"),
+        on_click=ProposalState.toggle_details(proposal_id),
+        variant="ghost",
+        size="1",
+        margin_bottom="0.5rem",
+    )
     voting_buttons = create_voting_buttons(proposal_id)
 
     return rx.box(
-        proposal_title,
+        rx.hstack(
+            rx.checkbox(
+                checked=ProposalState.selected.contains(proposal_id),
+                on_change=lambda checked: ProposalState.select_proposal(proposal_id, checked),
+                disabled=executed.bool(),
+            ),
+            proposal_title,
+            rx.cond(pending.bool(), rx.badge("Pending", color_scheme="amber")),
+            align="center",
+        ),
+        details_button,
         proposal_desc,
         rx.hstack(
             rx.cond(
-                executed,
+                executed.bool() | ended.bool(),
                 rx.text(rx.text("Voting ended", color="gray.500")),
-                voting_buttons,
+                rx.cond(
+                    vote_blocked != "",
+                    rx.text(vote_blocked, color="gray.500"),
+                    voting_buttons,
+                ),
             ),
-            create_execute_button(proposal_id, executed),
+            create_execute_button(proposal_id, executed, execute_blocked),
             display="flex",
             justify_content="space-between",
         ),
         border_bottom_width="1px",
         padding_bottom="1rem",
+        on_mouse_enter=ProposalState.prefetch_row_details(proposal_id).debounce(300),
         opacity=rx.cond(
             executed,
             "0.5",  # Dim if executed
@@ -221,16 +264,16 @@ def create_result_labels(left_label, right_label):
     )
 
 
-# To implement interactivity...
-def create_result_box(title, progress_width, yes_percentage, no_percentage):
+def create_result_box(result):
     """Create a box displaying voting results with a title, progress bar, and percentages."""
     return rx.box(
-        create_h3_heading(text=title),
-        create_progress_bar_container(progress_width=progress_width),
+        create_h3_heading(text=result["title"]),
+        create_progress_bar_container(progress_width=result["progress"]),
         create_result_labels(
-            left_label=yes_percentage,
-            right_label=no_percentage,
+            left_label=result["yes"],
+            right_label=result["no"],
         ),
+        rx.text(result["summary"], color="#6B7280", font_size="0.75rem"),
     )
 
 
@@ -291,6 +334,10 @@ def create_header():
                 rx.hstack(
                     create_disconnect_wallet_button(),
                     rx.text(WalletState.address, color="#4B5563"),
+                    rx.cond(
+                        WalletState.voting_power != "",
+                        rx.badge(f"Voting power: {WalletState.voting_power}", color_scheme="blue"),
+                    ),
                     align_items="center",
                 ),
                 create_connect_wallet_button(),
@@ -317,11 +364,153 @@ def create_header_container():
     )
 
 
+def create_bulk_actions():
+    """Buttons acting on every selected proposal at once."""
+    return rx.cond(
+        ProposalState.selected.length() > 0,
+        rx.hstack(
+            rx.text(f"{ProposalState.selected.length()} selected", color="#4B5563"),
+            rx.button(
+                "Vote Yes on selected",
+                on_click=ProposalState.bulk_vote_on_proposals(True),
+                bg="#10B981",
+                color="white",
+            ),
+            rx.button(
+                "Vote No on selected",
+                on_click=ProposalState.bulk_vote_on_proposals(False),
+                bg="#EF4444",
+                color="white",
+            ),
+            rx.button(
+                "Execute selected",
+                on_click=ProposalState.bulk_execute_proposals,
+                bg="#3B82F6",
+                color="white",
+            ),
+            align="center",
+            margin_bottom="1rem",
+        ),
+    )
+
+
+def create_highlighted_text(segments, **props):
+    """Text with the search matches in bold; segments are rendered as text, never as HTML."""
+    return rx.text(
+        rx.foreach(
+            segments.to(List[Dict[str, Any]]),
+            lambda segment: rx.text.span(
+                segment["text"],
+                font_weight=rx.cond(segment["match"], "700", "400"),
+                background_color=rx.cond(segment["match"], "#FEF3C7", "transparent"),
+            ),
+        ),
+        **props,
+    )
+
+
+def create_search_result(result):
+    """A search hit: highlighted title and description snippet."""
+    return rx.box(
+        rx.hstack(
+            rx.text(f"#{result['id']}", color="#6B7280"),
+            create_highlighted_text(result["title"], font_weight="500"),
+            align="center",
+        ),
+        create_highlighted_text(result["snippet"], color="#4B5563", font_size="0.875rem"),
+        on_click=ProposalState.toggle_details(result["id"]),
+        cursor="pointer",
+        padding_y="0.5rem",
+        border_bottom_width="1px",
+    )
+
+
+def create_search():
+    """Search box over proposal titles and descriptions, with its results."""
+    return rx.box(
+        rx.input(
+            placeholder="Search proposals...",
+            on_change=ProposalState.search.debounce(250),
+            width="100%",
+        ),
+        rx.cond(
+            ProposalState.search_query != "",
+            rx.box(
+                rx.cond(
+                    ProposalState.search_results.length() > 0,
+                    rx.foreach(ProposalState.search_results, create_search_result),
+                    rx.text("No matching proposals", color="#6B7280"),
+                ),
+                margin_top="0.5rem",
+            ),
+        ),
+        margin_bottom="1rem",
+    )
+
+
+def create_pending_proposal(pending):
+    """A proposal created from this session whose transaction is not mined yet."""
+    return rx.hstack(
+        rx.spinner(size="1"),
+        rx.text(pending["title"], color="#6B7280"),
+        rx.badge("Waiting for confirmation", color_scheme="amber"),
+        align="center",
+        padding_bottom="1rem",
+        border_bottom_width="1px",
+    )
+
+
+def create_execute_suggestion(proposal_id):
+    """Suggest executing a proposal whose voting period just ended."""
+    return rx.callout.root(
+        rx.hstack(
+            rx.callout.text(f"Voting on proposal #{proposal_id} ended. Execute it?"),
+            rx.button(
+                "Execute",
+                on_click=ProposalState.execute_proposal(proposal_id),
+                size="1",
+            ),
+            rx.button(
+                "Dismiss",
+                on_click=ProposalState.dismiss_suggestion(proposal_id),
+                variant="ghost",
+                size="1",
+            ),
+            align="center",
+        ),
+        color_scheme="blue",
+        margin_bottom="1rem",
+    )
+
+
 def create_voting_section():
     """Create voting section with reactive proposal list."""
     return rx.box(
-        create_h2_heading(text="Active Proposals"),
+        rx.hstack(
+            create_h2_heading(text="Active Proposals"),
+            rx.select(
+                list(PROPOSAL_FILTERS),
+                value=ProposalState.proposal_filter,
+                on_change=ProposalState.set_proposal_filter,
+            ),
+            justify="between",
+            width="100%",
+        ),
+        create_search(),
+        create_bulk_actions(),
+        rx.foreach(ProposalState.execute_suggestions, create_execute_suggestion),
+        rx.foreach(ProposalState.pending_proposals, create_pending_proposal),
         rx.foreach(ProposalState.proposals, lambda prop: create_proposal_box(prop)),
+        rx.cond(
+            ProposalState.next_cursor > 0,
+            rx.button(
+                "Load more proposals",
+                on_click=ProposalState.load_more_proposals,
+                variant="soft",
+                width="100%",
+                margin_top="1rem",
+            ),
+        ),
         id="voting-section",
         background_color="#ffffff",
         margin_bottom="2rem",
@@ -336,18 +525,7 @@ def create_results_section():
     return rx.box(
         create_h2_heading(text="Voting Results"),
         rx.box(
-            create_result_box(
-                title="Proposal 1 Results",
-                progress_width="75%",
-                yes_percentage="Yes: 75%",
-                no_percentage="No: 25%",
-            ),
-            create_result_box(
-                title="Proposal 2 Results",
-                progress_width="60%",
-                yes_percentage="Yes: 60%",
-                no_percentage="No: 40%",
-            ),
+            rx.foreach(ProposalState.results, create_result_box),
             display="flex",
             flex_direction="column",
             gap="1.5rem",
@@ -444,6 +622,15 @@ def index():
 
 
 app = rx.App()
+app.register_lifespan_task(
+    run_indexer, get_web3=get_web3, get_contract=get_dao_contract, get_token_contract=get_token_contract
+)
+app.register_lifespan_task(async_web3_lifespan)
+app.register_lifespan_task(run_fee_oracle, get_web3=get_web3)
+app.register_lifespan_task(run_subscriber, rx_app=app)
+app.register_lifespan_task(run_deadline_scheduler, rx_app=app)
+mount_metrics(app)
+mount_export(app)
 app.add_page(
     index, on_load=[ProposalState.get_proposals]
 )  # Load proposals on page load
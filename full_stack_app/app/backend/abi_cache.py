@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Settings
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "../out")
+# Snapshot of the ABIs of our contracts, by contract, so the app starts
+# without `forge build`. Maintained by hand: after changing a contract,
+# refresh it with `python -m app.backend.abi_cache`.
+ABI_CACHE_PATH = os.path.join(os.path.dirname(__file__), "abi_cache.json")
+# ABIs read from the Forge artifacts, keyed by contract and by the hash of
+# the artifact, so an unchanged artifact is not parsed again. Kept out of git.
+ABI_LOCAL_CACHE_PATH = os.getenv(
+    "ABI_LOCAL_CACHE_PATH", os.path.join(os.path.dirname(__file__), "abi_cache.local.json")
+)
+
+logger = logging.getLogger(__name__)
+
+# Committed snapshot and local artifact cache, loaded on first use
+_snapshot = {}
+_artifacts = {}
+_lock = threading.Lock()
+
+
+def artifact_path(contract_name):
+    name = os.path.splitext(contract_name)[0]
+    return os.path.join(ARTIFACTS_DIR, contract_name, f"{name}.json")
+
+
+def _read_json(path, into):
+    if not into and os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                into.update(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to read the ABI cache %s: %s", path, e)
+    return into
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def load_abi(contract_name: str):
+    """
+    ABI of a contract. When its Forge artifact exists, the ABI comes from it,
+    parsed only when its hash differs from the locally cached one; otherwise
+    the committed snapshot is used.
+    """
+    with _lock:
+        path = artifact_path(contract_name)
+        if not os.path.exists(path):
+            entry = _read_json(ABI_CACHE_PATH, _snapshot).get(contract_name)
+            if entry is None:
+                raise FileNotFoundError(f"ABI não encontrada para {contract_name} em {path}.")
+            return entry["abi"]
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        cache = _read_json(ABI_LOCAL_CACHE_PATH, _artifacts)
+        entry = cache.get(contract_name)
+        if entry is None or entry["hash"] != digest:
+            artifact = json.loads(raw)
+            if "abi" not in artifact:
+                raise KeyError(f"'abi' não encontrado no arquivo {path}.")
+            entry = {"hash": digest, "abi": artifact["abi"]}
+            cache[contract_name] = entry
+            try:
+                _write_json(ABI_LOCAL_CACHE_PATH, cache)
+            except OSError as e:
+                # The ABI is still served from memory
+                logger.warning("Failed to write the ABI cache %s: %s", ABI_LOCAL_CACHE_PATH, e)
+        return entry["abi"]
+
+
+def main(contract_names=("DAO.sol", "TokenDAO.sol")):
+    """Refresh the committed snapshot from the Forge artifacts."""
+    snapshot = {}
+    for contract_name in contract_names:
+        with open(artifact_path(contract_name), "r") as f:
+            snapshot[contract_name] = {"abi": json.load(f)["abi"]}
+    _write_json(ABI_CACHE_PATH, snapshot)
+    print(f"Wrote {', '.join(contract_names)} to {ABI_CACHE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
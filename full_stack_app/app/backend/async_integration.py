@@ -0,0 +1,467 @@
+import asyncio
+import os
+import time
+import aiohttp
+from web3 import AsyncWeb3, Web3
+from contextlib import asynccontextmanager
+from .integration import (
+    RPC_URL,
+    DAO_ADDRESS,
+    TOKEN_ADDRESS,
+    PROPOSAL_PAGE_SIZE,
+    proposal_dict,
+    proposal_summary,
+    cache_detail,
+    page_ids,
+    next_cursor,
+    preflight_error,
+    vote_gas_state,
+    abi_has_summary_view,
+    code_has_summary_view,
+    summary_views,
+    SUMMARY_VIEW_SIZE,
+    summary_view_calls,
+    summaries_by_id,
+)
+from .abi_cache import load_abi
+from .providers import make_async_provider
+from .batch import BATCH_CHUNK_SIZE, async_batch_call
+from .cache import async_cached_read, detail_cache, read_cache
+from .nonce import nonce_manager
+from .fees import fee_oracle, async_estimate_gas
+from .tallies import proposal_result
+from .metrics import instrument
+from .bulk import batch_transactions
+from .balances import MIN_VOTING_POWER
+from .preflight import async_simulate
+from . import indexer, queries
+
+# Settings
+# Max concurrent RPC requests from this process
+ASYNC_RPC_CONCURRENCY = int(os.getenv("ASYNC_RPC_CONCURRENCY", "16"))
+ASYNC_RPC_TIMEOUT = float(os.getenv("ASYNC_RPC_TIMEOUT", "30"))
+# Rows whose details are loaded ahead of the user expanding them
+DETAIL_PREFETCH_ROWS = int(os.getenv("DETAIL_PREFETCH_ROWS", "10"))
+# Proposals read from the index per query, in a worker thread, when loading them all
+INDEX_READ_PAGE_SIZE = int(os.getenv("INDEX_READ_PAGE_SIZE", "1000"))
+
+# Created on first use, inside the running event loop
+_client = {}
+_client_lock = asyncio.Lock()
+
+
+async def get_web3():
+    """Shared AsyncWeb3 client backed by a pooled aiohttp session."""
+    if "web3" in _client:
+        return _client["web3"]
+    async with _client_lock:
+        if "web3" in _client:
+            return _client["web3"]
+        provider = make_async_provider(RPC_URL)
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_RPC_CONCURRENCY),
+            timeout=aiohttp.ClientTimeout(total=ASYNC_RPC_TIMEOUT),
+        )
+        await provider.cache_async_session(session)
+        web3 = instrument(AsyncWeb3(provider))
+        _client["session"] = session
+        _client["semaphore"] = asyncio.Semaphore(ASYNC_RPC_CONCURRENCY)
+        _client["dao_contract"] = web3.eth.contract(address=DAO_ADDRESS, abi=load_abi("DAO.sol"))
+        _client["token_contract"] = web3.eth.contract(address=TOKEN_ADDRESS, abi=load_abi("TokenDAO.sol"))
+        _client["web3"] = web3
+        return web3
+
+
+async def get_dao_contract():
+    await get_web3()
+    return _client["dao_contract"]
+
+
+async def get_token_contract():
+    await get_web3()
+    return _client["token_contract"]
+
+
+async def close_web3():
+    """Close the pooled aiohttp session."""
+    session = _client.pop("session", None)
+    _client.clear()
+    if session is not None:
+        await session.close()
+
+
+@asynccontextmanager
+async def async_web3_lifespan():
+    """Lifespan task that releases the connection pool on shutdown."""
+    try:
+        yield
+    finally:
+        await close_web3()
+
+
+async def limited(awaitable):
+    """Await an RPC request without exceeding ASYNC_RPC_CONCURRENCY in flight."""
+    await get_web3()
+    async with _client["semaphore"]:
+        return await awaitable
+
+
+async def pending_transaction_count(address):
+    """Transaction count of `address` including its pending transactions."""
+    web3 = await get_web3()
+    return await limited(web3.eth.get_transaction_count(address, "pending"))
+
+
+async def _build(function, sender_address, gas, gas_state=None, block_number=None):
+    sender = Web3.to_checksum_address(sender_address)
+    nonce = await nonce_manager.async_next_nonce(sender, pending_transaction_count)
+    try:
+        if not fee_oracle.is_ready():
+            await fee_oracle.async_refresh(await get_web3())
+        return await limited(function.build_transaction({
+            'from': sender,
+            'nonce': nonce,
+            'gas': await limited(async_estimate_gas(function, sender, gas, gas_state, block_number)),
+            **fee_oracle.fee_params(),
+        }))
+    except Exception:
+        nonce_manager.release(sender, nonce)
+        raise
+
+
+async def voting_power(address):
+    """Same as integration.voting_power."""
+    address = Web3.to_checksum_address(address)
+    if indexer.balances_ready():
+        power = indexer.indexed_balance(address)
+        if power >= MIN_VOTING_POWER:
+            return power
+    web3 = await get_web3()
+    token_contract = await get_token_contract()
+
+    async def load(block_number):
+        call = token_contract.functions.balanceOf(address)
+        return await limited(call.call(block_identifier=block_number))
+
+    return await async_cached_read(web3, (token_contract.address, "balanceOf", (address,)), load)
+
+
+async def require_voting_power(address):
+    """Same as integration.require_voting_power."""
+    if await voting_power(address) < MIN_VOTING_POWER:
+        raise Exception("Insufficient tokens: at least 1 BCI is required to create proposals and vote.")
+
+
+async def simulate_calls(calls, sender_address):
+    """Same as integration.simulate_calls."""
+    web3 = await get_web3()
+    dao_contract = await get_dao_contract()
+    sender = Web3.to_checksum_address(sender_address)
+    block_number = await read_cache.async_current_block(web3)
+    return await limited(async_simulate(web3, dao_contract, sender, calls, block_number))
+
+
+async def preflight(calls, sender_address):
+    """Same as integration.preflight."""
+    error = preflight_error(calls, await simulate_calls(calls, sender_address))
+    if error:
+        raise Exception(error)
+
+
+async def proposal_verdicts(proposal_ids, sender_address):
+    """Same as integration.proposal_verdicts."""
+    ids = list(proposal_ids)
+    calls = [call for i in ids for call in (("castVote", (i, True)), ("executeProposal", (i,)))]
+    reasons = await simulate_calls(calls, sender_address)
+    return {
+        str(i): {"vote": reasons[2 * n] or "", "execute": reasons[2 * n + 1] or ""}
+        for n, i in enumerate(ids)
+    }
+
+
+# Funções de interação com os contratos
+async def create_proposal(title, description, voting_period, sender_address):
+    """Create a proposal on the DAO."""
+    try:
+        dao_contract = await get_dao_contract()
+        function = dao_contract.functions.createProposal(title, description, voting_period)
+        await require_voting_power(sender_address)
+        await preflight([("createProposal", (title, description, voting_period))], sender_address)
+        return await _build(function, sender_address, 2000000)
+    except Exception as e:
+        raise Exception(f"Failed to create the proposal. {str(e)}")
+
+
+async def vote(proposal_id, support, sender_address):
+    """Cast a vote on a proposal."""
+    try:
+        dao_contract = await get_dao_contract()
+        function = dao_contract.functions.castVote(proposal_id, support)
+        await require_voting_power(sender_address)
+        await preflight([("castVote", (proposal_id, support))], sender_address)
+        # The gas state and the estimate are read at the same block
+        block_number = await read_cache.async_current_block(await get_web3())
+        gas_state = (await gas_states(dao_contract, "castVote", [(proposal_id, support)], block_number))[0]
+        return await _build(function, sender_address, 2000000, gas_state, block_number)
+    except Exception as e:
+        raise Exception(f"Failed to cast the vote. {str(e)}")
+
+
+async def execute_proposal(proposal_id, sender_address):
+    """Execute a proposal."""
+    try:
+        dao_contract = await get_dao_contract()
+        function = dao_contract.functions.executeProposal(proposal_id)
+        await preflight([("executeProposal", (proposal_id,))], sender_address)
+        return await _build(function, sender_address, 3000000)
+    except Exception as e:
+        raise Exception(f"Failed to execute the proposal. {str(e)}")
+
+
+async def gas_states(dao_contract, fn_name, calls, block_number):
+    """Same as integration.gas_states."""
+    if fn_name != "castVote":
+        return [None] * len(calls)
+    proposals = await read_proposals(dao_contract, [i for i, _ in calls], block_number)
+    return [vote_gas_state(p, support) for p, (_, support) in zip(proposals, calls)]
+
+
+async def _build_batch(fn_name, calls, sender_address, default_gas):
+    sender = Web3.to_checksum_address(sender_address)
+    if not calls:
+        return []
+    nonces = await nonce_manager.async_next_nonces(sender, len(calls), pending_transaction_count)
+    try:
+        web3 = await get_web3()
+        dao_contract = await get_dao_contract()
+        if not fee_oracle.is_ready():
+            await fee_oracle.async_refresh(web3)
+        # Gas states and estimates are read at the same block
+        block_number = await read_cache.async_current_block(web3)
+        states = await gas_states(dao_contract, fn_name, calls, block_number)
+        # One gas estimate per gas state (see integration.vote_gas_state)
+        gas_limits = {}
+        for args, state in zip(calls, states):
+            if state not in gas_limits:
+                function = dao_contract.functions[fn_name](*args)
+                gas_limits[state] = await limited(
+                    async_estimate_gas(function, sender, default_gas, state, block_number)
+                )
+        chain_id = await limited(web3.eth.chain_id)
+        return batch_transactions(
+            dao_contract, fn_name, calls, sender, nonces, [gas_limits[state] for state in states],
+            chain_id, fee_oracle.fee_params(),
+        )
+    except Exception:
+        for nonce in reversed(nonces):
+            nonce_manager.release(sender, nonce)
+        raise
+
+
+async def bulk_vote(votes, sender_address):
+    """Cast votes on many proposals: one transaction per (proposal_id, support) pair, in order."""
+    try:
+        calls = [(int(proposal_id), bool(support)) for proposal_id, support in votes]
+        await require_voting_power(sender_address)
+        await preflight([("castVote", args) for args in calls], sender_address)
+        return await _build_batch("castVote", calls, sender_address, 2000000)
+    except Exception as e:
+        raise Exception(f"Failed to cast the votes. {str(e)}")
+
+
+async def bulk_execute(proposal_ids, sender_address):
+    """Execute many proposals: one transaction per proposal, in order."""
+    try:
+        calls = [(int(proposal_id),) for proposal_id in proposal_ids]
+        await preflight([("executeProposal", args) for args in calls], sender_address)
+        return await _build_batch("executeProposal", calls, sender_address, 3000000)
+    except Exception as e:
+        raise Exception(f"Failed to execute the proposals. {str(e)}")
+
+
+async def get_proposal(proposal_id):
+    """Get proposal details."""
+    if indexer.is_ready():
+        proposal = indexer.indexed_proposal(proposal_id)
+        if proposal is not None:
+            return proposal
+
+    web3 = await get_web3()
+    dao_contract = await get_dao_contract()
+
+    async def load(block_number):
+        call = dao_contract.functions.getProposal(proposal_id)
+        return await limited(call.call(block_identifier=block_number))
+
+    return await async_cached_read(web3, (dao_contract.address, "getProposal", (proposal_id,)), load)
+
+
+async def has_summary_view(dao_contract):
+    """Same as integration.has_summary_view."""
+    address = dao_contract.address
+    if address not in summary_views:
+        summary_views[address] = abi_has_summary_view(dao_contract) and code_has_summary_view(
+            await limited(dao_contract.w3.eth.get_code(address))
+        )
+    return summary_views[address]
+
+
+async def read_proposals(dao_contract, ids, block_number):
+    """getProposal results of `ids`, in their order, in a few batched round trips."""
+    web3 = await get_web3()
+    return await limited(async_batch_call(
+        web3,
+        [dao_contract.functions.getProposal(i) for i in ids],
+        block_identifier=block_number,
+    ))
+
+
+async def read_summaries(dao_contract, ids, block_number):
+    """Same as integration.read_summaries."""
+    web3 = await get_web3()
+    results = await limited(async_batch_call(
+        web3,
+        summary_view_calls(dao_contract, ids),
+        chunk_size=max(1, BATCH_CHUNK_SIZE // SUMMARY_VIEW_SIZE),
+        block_identifier=block_number,
+    ))
+    summaries = summaries_by_id(results)
+    return [summaries[i] for i in ids]
+
+
+async def list_proposals():
+    """List all proposals as summaries (see proposal_summary)."""
+    web3 = await get_web3()
+    dao_contract = await get_dao_contract()
+    proposals = await async_cached_read(
+        web3, (dao_contract.address, "list_proposals", ()), _load_proposals
+    )
+    # Copy the entries so a session never mutates the shared cached list
+    return [dict(p) for p in proposals]
+
+
+async def indexed_summaries():
+    """
+    Every proposal from the index, in id order. The SQLite reads run in a
+    worker thread, a page of INDEX_READ_PAGE_SIZE at a time, so they never
+    block the event loop.
+    """
+    pages = []
+    before = None
+    while True:
+        page = await asyncio.to_thread(indexer.indexed_summaries, before, INDEX_READ_PAGE_SIZE)
+        pages.append(page)
+        if len(page) < INDEX_READ_PAGE_SIZE:
+            break
+        before = page[-1]["id"]
+    # Pages come newest first
+    return [p for page in reversed(pages) for p in reversed(page)]
+
+
+async def _load_proposals(block_number):
+    if indexer.is_ready():
+        return [proposal_summary(p) for p in await indexed_summaries()]
+
+    dao_contract = await get_dao_contract()
+    proposal_count = await limited(
+        dao_contract.functions.proposalCount().call(block_identifier=block_number)
+    )
+    ids = range(1, proposal_count + 1)
+    if await has_summary_view(dao_contract):
+        return await read_summaries(dao_contract, ids, block_number)
+    results = await read_proposals(dao_contract, ids, block_number)
+    proposals = [proposal_dict(i, p) for i, p in zip(ids, results)]
+    # getProposal returned the descriptions anyway
+    for proposal in proposals:
+        cache_detail(proposal)
+    return [proposal_summary(p) for p in proposals]
+
+
+async def list_proposal_page(cursor=None, limit=None):
+    """
+    One page of proposal summaries, newest first, and the cursor of the next
+    page (None on the last page). `cursor` is the last id of the previous page.
+    """
+    limit = limit or PROPOSAL_PAGE_SIZE
+    web3 = await get_web3()
+    dao_contract = await get_dao_contract()
+
+    async def load(block_number):
+        if indexer.is_ready():
+            return [proposal_summary(p) for p in indexer.indexed_summaries(cursor, limit)]
+        proposal_count = await limited(
+            dao_contract.functions.proposalCount().call(block_identifier=block_number)
+        )
+        ids = page_ids(proposal_count, cursor, limit)
+        if await has_summary_view(dao_contract):
+            return await read_summaries(dao_contract, ids, block_number)
+        results = await read_proposals(dao_contract, ids, block_number)
+        proposals = [proposal_dict(i, p) for i, p in zip(ids, results)]
+        for proposal in proposals:
+            cache_detail(proposal)
+        return [proposal_summary(p) for p in proposals]
+
+    page = await async_cached_read(web3, (dao_contract.address, "proposal_page", (cursor, limit)), load)
+    return [dict(p) for p in page], next_cursor([p["id"] for p in page])
+
+
+async def query_proposals(status=None, ending_within=None, proposer=None, sort="newest", cursor=None, limit=None):
+    """Same as integration.query_proposals."""
+    limit = limit or PROPOSAL_PAGE_SIZE
+    if status is None and ending_within is None and proposer is None and sort == "newest":
+        return await list_proposal_page(cursor, limit)
+    filters = dict(
+        status=status, ending_within=ending_within, proposer=proposer,
+        sort=sort, cursor=cursor, limit=limit,
+    )
+    now = int(time.time())
+    if indexer.is_ready():
+        page = [proposal_summary(p) for p in indexer.indexed_query(now, **filters)]
+    else:
+        page = queries.filter_proposals(await list_proposals(), now, **filters)
+    return page, queries.next_query_cursor(page, sort, limit)
+
+
+async def get_proposal_detail(proposal_id):
+    """Full title, description and proposer of a proposal, from the detail cache."""
+    detail = detail_cache.get(proposal_id)
+    if detail is None:
+        detail = cache_detail(proposal_dict(proposal_id, await get_proposal(proposal_id)))
+    return detail
+
+
+async def prefetch_details(proposal_ids):
+    """Load the details of `proposal_ids` that are not cached yet."""
+    missing = [i for i in proposal_ids if i not in detail_cache]
+    await asyncio.gather(*(get_proposal_detail(i) for i in missing), return_exceptions=True)
+
+
+async def search_proposals(text, limit=None):
+    """Ranked proposals matching `text` with highlighted matches; empty until the index caught up."""
+    if not indexer.is_ready():
+        return []
+    return indexer.indexed_search(text, limit)
+
+
+async def total_supply():
+    """Total supply of the DAO token."""
+    if indexer.balances_ready():
+        return indexer.indexed_total_supply()
+    web3 = await get_web3()
+    token_contract = await get_token_contract()
+
+    async def load(block_number):
+        call = token_contract.functions.totalSupply()
+        return await limited(call.call(block_identifier=block_number))
+
+    return await async_cached_read(web3, (token_contract.address, "totalSupply", ()), load)
+
+
+async def voting_results(proposals):
+    """Results section entries for `proposals`, from their totals and the indexed aggregates."""
+    tallies = indexer.indexed_tallies(p["id"] for p in proposals) if indexer.is_ready() else {}
+    try:
+        supply = await total_supply()
+    except Exception:
+        supply = 0
+    return [proposal_result(p, tallies.get(p["id"]), supply) for p in proposals]
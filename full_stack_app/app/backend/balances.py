@@ -0,0 +1,115 @@
+import functools
+from web3 import Web3
+from .tallies import TOKEN_DECIMALS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_balances (
+    holder TEXT PRIMARY KEY,
+    balance TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_token_balances_balance ON token_balances (balance);
+CREATE TABLE IF NOT EXISTS token_balance_history (
+    holder TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    balance TEXT NOT NULL,
+    PRIMARY KEY (holder, block_number, log_index)
+);
+CREATE TABLE IF NOT EXISTS token_supply_history (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    supply TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+"""
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# DAO.sol requires this balance to create a proposal or vote (1 ether)
+MIN_VOTING_POWER = 10 ** 18
+# Amounts are stored as zero-padded text, so text order is numeric order
+AMOUNT_DIGITS = 78
+
+
+def format_tokens(value):
+    """Token amount in whole tokens, for display."""
+    return f"{value / 10 ** TOKEN_DECIMALS:,.2f} BCI"
+
+
+def amount(value):
+    return str(value).zfill(AMOUNT_DIGITS)
+
+
+def _latest(conn, query, params, block):
+    if block is not None:
+        query += " AND block_number <= ?"
+        params = (*params, block)
+    row = conn.execute(query + " ORDER BY block_number DESC, log_index DESC LIMIT 1", params).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _move(conn, holder, delta, block_number, log_index):
+    row = conn.execute("SELECT balance FROM token_balances WHERE holder = ?", (holder,)).fetchone()
+    balance = amount((int(row[0]) if row else 0) + delta)
+    conn.execute(
+        "INSERT INTO token_balances (holder, balance) VALUES (?, ?) "
+        "ON CONFLICT(holder) DO UPDATE SET balance = excluded.balance",
+        (holder, balance),
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO token_balance_history (holder, block_number, log_index, balance) VALUES (?, ?, ?, ?)",
+        (holder, block_number, log_index, balance),
+    )
+
+
+@functools.lru_cache(maxsize=65536)
+def _checksum(address):
+    # Holders repeat across transfers, and checksumming is most of the decoding cost
+    return Web3.to_checksum_address(address)
+
+
+def decode_transfer(log):
+    """
+    (from, to, value) of an ERC20 Transfer log. Its layout is fixed, so this
+    skips the generic ABI decoding of process_log, which dominates a backfill.
+    """
+    topics = log["topics"]
+    return (
+        _checksum(bytes(topics[1])[-20:]),
+        _checksum(bytes(topics[2])[-20:]),
+        int.from_bytes(bytes(log["data"]), "big"),
+    )
+
+
+def apply_transfer(conn, sender, recipient, value, block_number, log_index):
+    """Apply one Transfer to the balances, their history and the total supply, in O(1)."""
+    if sender == ZERO_ADDRESS or recipient == ZERO_ADDRESS:
+        supply = total_supply(conn) + (value if sender == ZERO_ADDRESS else -value)
+        conn.execute(
+            "INSERT OR REPLACE INTO token_supply_history (block_number, log_index, supply) VALUES (?, ?, ?)",
+            (block_number, log_index, amount(supply)),
+        )
+    if sender != ZERO_ADDRESS:
+        _move(conn, sender, -value, block_number, log_index)
+    if recipient != ZERO_ADDRESS:
+        _move(conn, recipient, value, block_number, log_index)
+
+
+def balance_of(conn, holder, block=None):
+    """Balance of `holder` at the last indexed block, or at the end of `block`."""
+    if block is None:
+        row = conn.execute("SELECT balance FROM token_balances WHERE holder = ?", (holder,)).fetchone()
+        return int(row[0]) if row else 0
+    return _latest(conn, "SELECT balance FROM token_balance_history WHERE holder = ?", (holder,), block)
+
+
+def total_supply(conn, block=None):
+    """Total supply at the last indexed block, or at the end of `block`."""
+    return _latest(conn, "SELECT supply FROM token_supply_history WHERE 1", (), block)
+
+
+def top_holders(conn, limit):
+    """The `limit` largest balances, as [{"holder", "balance"}]."""
+    rows = conn.execute(
+        "SELECT holder, balance FROM token_balances ORDER BY balance DESC LIMIT ?", (limit,)
+    ).fetchall()
+    return [{"holder": row[0], "balance": int(row[1])} for row in rows]
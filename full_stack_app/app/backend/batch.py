@@ -0,0 +1,247 @@
+import asyncio
+import os
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+from eth_utils.abi import get_abi_output_types
+from dotenv import load_dotenv
+from .metrics import timed
+
+load_dotenv()
+
+# Settings
+# Multicall3 is deployed at the same address on mainnet, Sepolia and most testnets
+MULTICALL_ADDRESS = os.getenv("MULTICALL_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "200"))
+
+MULTICALL_ABI = [
+    {
+        "name": "aggregate3",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+# Read strategies, from cheapest to most expensive. The first one that fails on
+# the current node is dropped so we do not pay for the failure on every call.
+STRATEGIES = ["multicall", "rpc_batch", "sequential"]
+_strategies = list(STRATEGIES)
+# Same, for the AsyncWeb3 client, whose provider may support less
+_async_strategies = list(STRATEGIES)
+
+# JSON-RPC "method not found", and what nodes and providers answer for a missing feature
+METHOD_NOT_FOUND = -32601
+UNSUPPORTED_MESSAGES = ("method not found", "not supported", "not available", "not implemented", "unsupported")
+
+
+def is_unsupported(error):
+    """
+    Whether `error`, an exception or a JSON-RPC error object, means the node or
+    provider lacks a feature (batches, a method, Multicall3 at its address),
+    as opposed to a transient failure that may not happen on the next call.
+    """
+    if isinstance(error, ContractLogicError):
+        # A revert says nothing about the node
+        return False
+    if isinstance(error, (NotImplementedError, AttributeError, BadFunctionCallOutput)):
+        # No batch support in the provider, or no contract code at the address
+        return True
+    if isinstance(error, BatchRejected):
+        error = error.error
+    elif isinstance(error, BaseException):
+        response = getattr(error, "rpc_response", None)
+        rpc_error = response.get("error") if isinstance(response, dict) else None
+        error = rpc_error if isinstance(rpc_error, dict) else {"message": str(error)}
+    if not isinstance(error, dict):
+        return False
+    if error.get("code") == METHOD_NOT_FOUND:
+        return True
+    message = str(error.get("message", "")).lower()
+    return any(text in message for text in UNSUPPORTED_MESSAGES)
+
+
+def raw_batch_request(web3, requests):
+    """
+    Send [(method, params)] as one JSON-RPC batch through the middlewares (so
+    metrics count it) and return the raw responses. Unlike web3.batch_requests(),
+    an error in one response, like a revert or a missing receipt, does not fail the others.
+    """
+    request_func = web3.provider.batch_request_func(web3, web3.middleware_onion)
+    responses = request_func(requests)
+    if not isinstance(responses, list):
+        # A single error for the whole batch
+        raise BatchRejected(responses.get("error") if isinstance(responses, dict) else responses)
+    return responses
+
+
+async def async_raw_batch_request(web3, requests):
+    """Same as raw_batch_request, for an AsyncWeb3 client."""
+    request_func = await web3.provider.batch_request_func(web3, web3.middleware_onion)
+    responses = await request_func(requests)
+    if not isinstance(responses, list):
+        raise BatchRejected(responses.get("error") if isinstance(responses, dict) else responses)
+    return responses
+
+
+class BatchRejected(Exception):
+    """The node answered a JSON-RPC batch, or a call of it, with an error that is not a result."""
+
+    def __init__(self, error):
+        super().__init__(f"Batch request rejected: {error}")
+        self.error = error
+
+
+def chunked(items, size):
+    """Split a list in chunks of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _normalize(output_types, values):
+    """Checksum addresses and unwrap single values, like ContractFunction.call()."""
+    values = [
+        Web3.to_checksum_address(v) if t == "address" else v
+        for t, v in zip(output_types, values)
+    ]
+    if len(values) == 1:
+        return values[0]
+    return values
+
+
+def _multicall_payload(web3, calls):
+    multicall = web3.eth.contract(address=MULTICALL_ADDRESS, abi=MULTICALL_ABI)
+    payload = [
+        (call.address, False, call._encode_transaction_data()) for call in calls
+    ]
+    return multicall.functions.aggregate3(payload)
+
+
+def _decode_multicall(web3, calls, results):
+    decoded = []
+    with timed("abi_decode"):
+        for call, (success, data) in zip(calls, results):
+            output_types = get_abi_output_types(call.abi)
+            decoded.append(_normalize(output_types, web3.codec.decode(output_types, data)))
+    return decoded
+
+
+def _multicall(web3, calls, block_identifier):
+    """Run all calls inside a single Multicall3 aggregate3 eth_call."""
+    results = _multicall_payload(web3, calls).call(block_identifier=block_identifier)
+    return _decode_multicall(web3, calls, results)
+
+
+def _rpc_batch(web3, calls, block_identifier):
+    """Send all calls as a single JSON-RPC batch request."""
+    with web3.batch_requests() as batch:
+        for call in calls:
+            batch.add(call.call(block_identifier=block_identifier))
+        return list(batch.execute())
+
+
+def _sequential(web3, calls, block_identifier):
+    """One eth_call per read. Works everywhere, used as last resort."""
+    return [call.call(block_identifier=block_identifier) for call in calls]
+
+
+_RUNNERS = {
+    "multicall": _multicall,
+    "rpc_batch": _rpc_batch,
+    "sequential": _sequential,
+}
+
+
+async def _async_multicall(web3, calls, block_identifier):
+    results = await _multicall_payload(web3, calls).call(block_identifier=block_identifier)
+    return _decode_multicall(web3, calls, results)
+
+
+async def _async_rpc_batch(web3, calls, block_identifier):
+    async with web3.batch_requests() as batch:
+        for call in calls:
+            batch.add(call.call(block_identifier=block_identifier))
+        return list(await batch.async_execute())
+
+
+async def _async_sequential(web3, calls, block_identifier):
+    return await asyncio.gather(*(call.call(block_identifier=block_identifier) for call in calls))
+
+
+_ASYNC_RUNNERS = {
+    "multicall": _async_multicall,
+    "rpc_batch": _async_rpc_batch,
+    "sequential": _async_sequential,
+}
+
+
+def batch_call(web3, calls, chunk_size=None, block_identifier="latest"):
+    """
+    Execute a list of contract reads (e.g. `contract.functions.getProposal(1)`)
+    in a small, fixed number of round trips and return the decoded results in
+    the same order.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    if block_identifier == "latest" and len(calls) > chunk_size:
+        # Pin every chunk to the same block so the result is consistent
+        block_identifier = web3.eth.block_number
+
+    results = []
+    for chunk in chunked(list(calls), chunk_size):
+        for strategy in list(_strategies):
+            try:
+                results.extend(_RUNNERS[strategy](web3, chunk, block_identifier))
+                break
+            except Exception as e:
+                if strategy == "sequential":
+                    raise
+                # Only a missing feature drops the strategy for good; after a
+                # transient failure the next one reads this chunk only
+                if is_unsupported(e) and strategy in _strategies:
+                    _strategies.remove(strategy)
+    return results
+
+
+async def async_batch_call(web3, calls, chunk_size=None, block_identifier="latest"):
+    """Same as batch_call, for an AsyncWeb3 client."""
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    if block_identifier == "latest" and len(calls) > chunk_size:
+        block_identifier = await web3.eth.block_number
+
+    results = []
+    for chunk in chunked(list(calls), chunk_size):
+        for strategy in list(_async_strategies):
+            try:
+                results.extend(await _ASYNC_RUNNERS[strategy](web3, chunk, block_identifier))
+                break
+            except Exception as e:
+                if strategy == "sequential":
+                    raise
+                if is_unsupported(e) and strategy in _async_strategies:
+                    _async_strategies.remove(strategy)
+    return results
+
+
+def reset_strategies():
+    """Forget failed strategies, e.g. after switching to another node."""
+    _strategies[:] = STRATEGIES
+    _async_strategies[:] = STRATEGIES
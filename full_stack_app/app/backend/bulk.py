@@ -0,0 +1,43 @@
+from eth_abi.encoding import TupleEncoder
+from eth_abi.registry import registry
+from eth_utils import function_abi_to_4byte_selector
+from eth_utils.abi import get_abi_input_types
+
+# (contract address, function name) -> (selector, argument encoder)
+_encoders = {}
+
+
+def function_encoder(contract, fn_name):
+    """Selector and argument encoder of a contract function, built once per process."""
+    key = (contract.address, fn_name)
+    if key not in _encoders:
+        abi = next(
+            item for item in contract.abi
+            if item.get("type") == "function" and item["name"] == fn_name
+        )
+        encoder = TupleEncoder(encoders=[registry.get_encoder(t) for t in get_abi_input_types(abi)])
+        _encoders[key] = (function_abi_to_4byte_selector(abi), encoder)
+    return _encoders[key]
+
+
+def encode_calldata(contract, fn_name, args):
+    """Calldata of `contract.fn_name(*args)` without going through build_transaction."""
+    selector, encoder = function_encoder(contract, fn_name)
+    return "0x" + (selector + encoder(args)).hex()
+
+
+def batch_transactions(contract, fn_name, calls, sender, nonces, gas_limits, chain_id, fee_params):
+    """One transaction per argument tuple in `calls`, with consecutive `nonces` and their `gas_limits`, in order."""
+    return [
+        {
+            "from": sender,
+            "to": contract.address,
+            "data": encode_calldata(contract, fn_name, args),
+            "value": 0,
+            "nonce": nonce,
+            "gas": gas,
+            "chainId": chain_id,
+            **fee_params,
+        }
+        for args, nonce, gas in zip(calls, nonces, gas_limits)
+    ]
@@ -0,0 +1,249 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from .metrics import register_collector
+
+load_dotenv()
+
+# Settings
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "1024"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "30"))
+# How long a block number is trusted before asking the node for a new head
+HEAD_POLL_INTERVAL = float(os.getenv("HEAD_POLL_INTERVAL", "2"))
+# Proposal details (full title and description) kept in memory
+DETAIL_CACHE_SIZE = int(os.getenv("DETAIL_CACHE_SIZE", "512"))
+
+
+class SingleFlight:
+    """
+    Runs a load once for every concurrent caller asking for the same key:
+    the first caller does the work and the others wait for its result.
+    """
+
+    def __init__(self):
+        self.flights = 0
+        self.shared = 0
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def suppression_rate(self):
+        """Share of the loads that were answered by another caller's request."""
+        total = self.flights + self.shared
+        return self.shared / total if total else 0.0
+
+    def do(self, key, fn):
+        """Result of `fn()`, shared with every thread asking for `key` meanwhile."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "value": None, "error": None}
+                self.flights += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["value"]
+
+        try:
+            call["value"] = fn()
+            return call["value"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    async def async_do(self, key, fn):
+        """Result of `await fn()`, shared with every task asking for `key` meanwhile."""
+        while key in self._futures:
+            future = self._futures[key]
+            self.shared += 1
+            try:
+                # Shielded: a waiter that gets cancelled must not cancel the load
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller doing the load was cancelled: take over
+                self.shared -= 1
+
+        future = self._futures[key] = asyncio.get_running_loop().create_future()
+        self.flights += 1
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here, so a load nobody else waited for is not reported as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._futures[key]
+
+
+read_flights = SingleFlight()
+
+
+class BlockCache:
+    """
+    Process-wide LRU/TTL cache for contract reads, keyed by
+    (contract, function, args, block number).
+    """
+
+    def __init__(self, maxsize=READ_CACHE_SIZE, ttl=READ_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.head = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._head_checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value for `key`, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store `value` under `key`, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def set_head(self, block_number):
+        """Record a new head and drop every entry read at an older block."""
+        with self._lock:
+            self._head_checked = time.monotonic()
+            if block_number == self.head:
+                return
+            self.head = block_number
+            stale = [key for key in self._entries if key[-1] < block_number]
+            for key in stale:
+                del self._entries[key]
+
+    def current_block(self, web3):
+        """Latest block number, asking the node at most once per HEAD_POLL_INTERVAL."""
+        if self.head is None or time.monotonic() - self._head_checked >= HEAD_POLL_INTERVAL:
+            self.set_head(read_flights.do(("eth_blockNumber",), lambda: web3.eth.block_number))
+        return self.head
+
+    async def async_current_block(self, web3):
+        """Same as current_block, for an AsyncWeb3 client."""
+        if self.head is None or time.monotonic() - self._head_checked >= HEAD_POLL_INTERVAL:
+            self.set_head(await read_flights.async_do(("eth_blockNumber",), lambda: web3.eth.block_number))
+        return self.head
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+read_cache = BlockCache()
+
+
+class LRUCache:
+    """Bounded LRU cache for values that never change once written, like proposal details."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+
+detail_cache = LRUCache(DETAIL_CACHE_SIZE)
+
+
+def _cache_metrics():
+    yield ("dao_read_cache_hits_total", "counter", "Reads served from the block cache.", (), read_cache.hits)
+    yield ("dao_read_cache_misses_total", "counter", "Reads that missed the block cache.", (), read_cache.misses)
+    yield ("dao_read_flights_total", "counter", "Loads sent to the node after a cache miss.", (), read_flights.flights)
+    yield ("dao_read_coalesced_total", "counter", "Loads that waited for an identical in-flight load instead.", (), read_flights.shared)
+    yield ("dao_read_suppression_ratio", "gauge", "Share of loads answered by an in-flight duplicate.", (), read_flights.suppression_rate())
+
+
+register_collector(_cache_metrics)
+
+
+def cached_read(web3, key, loader):
+    """
+    Return `loader(block_number)` for `key` at the current block, sharing a
+    single result between every caller until a new head arrives. Concurrent
+    misses for the same key and block run the loader once.
+    """
+    block_number = read_cache.current_block(web3)
+    block_key = (*key, block_number)
+    value = read_cache.get(block_key)
+    if value is None:
+        value = read_flights.do(block_key, lambda: _load(block_key, loader, block_number))
+    return value
+
+
+def _load(block_key, loader, block_number):
+    value = loader(block_number)
+    read_cache.set(block_key, value)
+    return value
+
+
+def cached_call(web3, call):
+    """Cached result of a contract read such as `contract.functions.getProposal(1)`."""
+    key = (call.address, call.fn_name, tuple(call.args))
+    return cached_read(web3, key, lambda block: call.call(block_identifier=block))
+
+
+async def async_cached_read(web3, key, loader):
+    """Same as cached_read, for an AsyncWeb3 client and a coroutine `loader`."""
+    block_number = await read_cache.async_current_block(web3)
+    block_key = (*key, block_number)
+    value = read_cache.get(block_key)
+    if value is None:
+        value = await read_flights.async_do(block_key, lambda: _async_load(block_key, loader, block_number))
+    return value
+
+
+async def _async_load(block_key, loader, block_number):
+    value = await loader(block_number)
+    read_cache.set(block_key, value)
+    return value
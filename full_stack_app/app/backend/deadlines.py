@@ -0,0 +1,101 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from .async_integration import list_proposals
+from .proposal_state import ProposalState
+
+load_dotenv()
+
+# Settings
+# Suggest executing a proposal to the connected sessions when its voting period ends
+DEADLINE_SUGGEST_EXECUTE = os.getenv("DEADLINE_SUGGEST_EXECUTE", "true").lower() in ("1", "true", "yes")
+# Seconds before loading the proposals again when the first load failed
+DEADLINE_RETRY_INTERVAL = float(os.getenv("DEADLINE_RETRY_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    Min-heap of the end times of the proposals still open for voting. The
+    scheduler sleeps until the earliest one, or until an earlier one is
+    added, so each deadline is handled when it passes without polling.
+    """
+
+    def __init__(self):
+        # (endTime, proposal id)
+        self.heap = []
+        self.scheduled = set()
+        self._changed = asyncio.Event()
+
+    def schedule(self, proposals):
+        """Add the open proposals of a list of summaries (see proposal_summary)."""
+        now = time.time()
+        earliest = self.heap[0][0] if self.heap else None
+        for proposal in proposals:
+            if proposal["executed"] or proposal["endTime"] <= now or proposal["id"] in self.scheduled:
+                continue
+            heapq.heappush(self.heap, (proposal["endTime"], proposal["id"]))
+            self.scheduled.add(proposal["id"])
+        if self.heap and self.heap[0][0] != earliest:
+            # Wake the scheduler so it sleeps until the new earliest deadline
+            self._changed.set()
+
+    def pop_due(self, now):
+        """Ids of the proposals whose end time passed, removed from the heap."""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, proposal_id = heapq.heappop(self.heap)
+            self.scheduled.discard(proposal_id)
+            due.append(proposal_id)
+        return due
+
+    async def wait_next(self):
+        """Sleep until the earliest deadline passes, and return the ids that ended."""
+        while True:
+            self._changed.clear()
+            delay = self.heap[0][0] - time.time() if self.heap else None
+            if delay is not None and delay <= 0:
+                return self.pop_due(time.time())
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+deadline_scheduler = DeadlineScheduler()
+
+
+async def push_expired_proposals(rx_app, proposal_ids):
+    """Mark `proposal_ids` as ended in every connected ProposalState."""
+    if rx_app.event_namespace is None:
+        return
+    for token in list(rx_app.event_namespace.token_to_sid):
+        try:
+            async with rx_app.modify_state(f"{token}_{ProposalState.get_full_name()}") as state:
+                proposal_state = await state.get_state(ProposalState)
+                proposal_state._expire_proposals(proposal_ids, DEADLINE_SUGGEST_EXECUTE)
+        except Exception as e:
+            logger.warning("Failed to push expired proposals to %s: %s", token, e)
+
+
+async def run_deadline_scheduler(rx_app):
+    """Publish the end of each voting period for the whole app lifespan."""
+    while True:
+        try:
+            # Proposals created later are added by the subscriber
+            deadline_scheduler.schedule(await list_proposals())
+            break
+        except Exception as e:
+            logger.exception("Deadline scheduler error: %s", e)
+            await asyncio.sleep(DEADLINE_RETRY_INTERVAL)
+
+    while True:
+        expired = await deadline_scheduler.wait_next()
+        try:
+            await push_expired_proposals(rx_app, expired)
+        except Exception as e:
+            logger.exception("Deadline scheduler error: %s", e)
@@ -0,0 +1,302 @@
+"""
+Streaming export of the DAO history (proposals, votes and executions) for BI tools.
+
+    cd full_stack_app
+    python -m app.backend.export --format csv --out dao.csv
+    python -m app.backend.export --format parquet --out dao-$(date +%F).parquet --state export_state.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from hexbytes import HexBytes
+from web3 import Web3
+from starlette.responses import JSONResponse, StreamingResponse
+from dotenv import load_dotenv
+from .integration import get_web3, get_dao_contract
+from .indexer import DAO_DEPLOY_BLOCK, INDEXER_CONFIRMATIONS, INDEXER_MIN_BLOCK_RANGE, dao_events
+
+load_dotenv()
+
+# Settings
+EXPORT_ENABLED = os.getenv("EXPORT_ENABLED", "false").lower() in ("1", "true", "yes")
+EXPORT_PATH = os.getenv("EXPORT_PATH", "/export")
+# Blocks per eth_getLogs request; halved while the provider rejects the range
+EXPORT_BLOCK_RANGE = int(os.getenv("EXPORT_BLOCK_RANGE", "2000"))
+# Records per Parquet row group, and so held in memory at once
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "10000"))
+
+# Columns of every record; the ones a record type does not have are empty.
+# Vote weights are uint256, so they are exported as decimal strings.
+FIELDS = (
+    "record",
+    "block_number",
+    "log_index",
+    "tx_hash",
+    "proposal_id",
+    "title",
+    "description",
+    "end_time",
+    "proposer",
+    "voter",
+    "support",
+    "weight",
+)
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def fetch_logs(web3, contract, from_block, to_block):
+    """DAO event logs between the two blocks, one block range in memory at a time."""
+    topics = [[event.topic for event in dao_events(contract)]]
+    size = EXPORT_BLOCK_RANGE
+    start = from_block
+    while start <= to_block:
+        end = min(start + size - 1, to_block)
+        try:
+            logs = web3.eth.get_logs({
+                "address": contract.address,
+                "fromBlock": start,
+                "toBlock": end,
+                "topics": topics,
+            })
+        except Exception:
+            # Most providers reject ranges with too many results: shrink and retry
+            if size <= INDEXER_MIN_BLOCK_RANGE:
+                raise
+            size = max(INDEXER_MIN_BLOCK_RANGE, size // 2)
+            continue
+        yield from logs
+        start = end + 1
+
+
+def _address(topic):
+    return "0x" + bytes(topic)[-20:].hex()
+
+
+def records(web3, contract, logs):
+    """
+    One export record per log. The DAO events have a fixed layout, so they are
+    decoded directly instead of through process_log, which dominates a large export.
+    """
+    created = HexBytes(contract.events.ProposalCreated().topic)
+    voted = HexBytes(contract.events.VoteCast().topic)
+    for log in logs:
+        topics = log["topics"]
+        record = dict.fromkeys(FIELDS)
+        record.update({
+            "block_number": log["blockNumber"],
+            "log_index": log["logIndex"],
+            "tx_hash": log["transactionHash"].to_0x_hex(),
+            "proposal_id": int.from_bytes(bytes(topics[1]), "big"),
+        })
+        if HexBytes(topics[0]) == created:
+            title, description, end_time = web3.codec.decode(["string", "string", "uint256"], bytes(log["data"]))
+            record.update({
+                "record": "proposal",
+                "title": title,
+                "description": description,
+                "end_time": end_time,
+                "proposer": Web3.to_checksum_address(_address(topics[2])),
+            })
+        elif HexBytes(topics[0]) == voted:
+            support, weight = web3.codec.decode(["bool", "uint256"], bytes(log["data"]))
+            record.update({
+                "record": "vote",
+                "voter": Web3.to_checksum_address(_address(topics[2])),
+                "support": support,
+                "weight": str(weight),
+            })
+        else:
+            record["record"] = "execution"
+        yield record
+
+
+def ndjson_chunks(rows):
+    """One JSON document per line."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def csv_chunks(rows):
+    """CSV with a header line, one chunk per row."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _Sink:
+    """Write-only file whose content is taken out after each Parquet row group."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(rows):
+    """Parquet file, one row group of EXPORT_ROW_GROUP_SIZE records at a time. Needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export needs pyarrow (pip install pyarrow).")
+
+    schema = pa.schema([
+        ("record", pa.string()),
+        ("block_number", pa.int64()),
+        ("log_index", pa.int64()),
+        ("tx_hash", pa.string()),
+        ("proposal_id", pa.int64()),
+        ("title", pa.string()),
+        ("description", pa.string()),
+        # DAO.sol end times go up to 2**64 - 1
+        ("end_time", pa.uint64()),
+        ("proposer", pa.string()),
+        ("voter", pa.string()),
+        ("support", pa.bool_()),
+        ("weight", pa.string()),
+    ])
+    sink = _Sink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    group = []
+    for row in rows:
+        group.append(row)
+        if len(group) >= EXPORT_ROW_GROUP_SIZE:
+            writer.write_table(pa.Table.from_pylist(group, schema=schema))
+            group = []
+            yield sink.take()
+    if group:
+        writer.write_table(pa.Table.from_pylist(group, schema=schema))
+    writer.close()
+    yield sink.take()
+
+
+WRITERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "parquet": parquet_chunks}
+
+
+def export_range(web3, from_block=None, to_block=None):
+    """
+    Blocks of an export: from `from_block` (the DAO deployment by default) to
+    `to_block` (the last confirmed block by default, like the indexer).
+    """
+    head = web3.eth.block_number - INDEXER_CONFIRMATIONS
+    from_block = DAO_DEPLOY_BLOCK if from_block is None else from_block
+    to_block = head if to_block is None else min(to_block, head)
+    return from_block, to_block
+
+
+def export(format, from_block, to_block):
+    """Chunks (str, or bytes for Parquet) of the records between the two blocks, in `format`."""
+    web3 = get_web3()
+    contract = get_dao_contract()
+    logs = fetch_logs(web3, contract, from_block, to_block)
+    return WRITERS[format](records(web3, contract, logs))
+
+
+def read_cursor(path):
+    """First block of the next incremental export, saved in the state file, or None."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)["next_block"]
+
+
+def write_cursor(path, next_block):
+    """Save the cursor once the export is complete, so a failed run is exported again."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"next_block": next_block}, f)
+    os.replace(tmp_path, path)
+
+
+def export_endpoint(format: str = "ndjson", from_block: int = None, to_block: int = None):
+    """
+    Stream an export. The X-Export-Next-Block header is the from_block of the
+    next incremental export.
+    """
+    if format not in FORMATS:
+        return JSONResponse({"error": f"format must be one of {', '.join(FORMATS)}"}, status_code=400)
+    from_block, to_block = export_range(get_web3(), from_block, to_block)
+    headers = {
+        "Content-Disposition": f'attachment; filename="dao-{from_block}-{to_block}.{format}"',
+        "X-Export-From-Block": str(from_block),
+        "X-Export-To-Block": str(to_block),
+        "X-Export-Next-Block": str(max(from_block, to_block + 1)),
+    }
+    return StreamingResponse(export(format, from_block, to_block), media_type=FORMATS[format], headers=headers)
+
+
+def mount(rx_app):
+    """Serve exports at EXPORT_PATH on the Reflex backend when enabled."""
+    if EXPORT_ENABLED:
+        rx_app.api.add_api_route(EXPORT_PATH, export_endpoint, methods=["GET"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.backend.export", description=__doc__.splitlines()[1])
+    parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    parser.add_argument("--out", help="output file; standard output without it")
+    parser.add_argument("--from-block", type=int, help="first block (default: the --state cursor, or DAO_DEPLOY_BLOCK)")
+    parser.add_argument("--to-block", type=int, help="last block (default: the last confirmed block)")
+    parser.add_argument("--state", help="JSON cursor file read and updated for incremental exports")
+    args = parser.parse_args(argv)
+
+    from_block = args.from_block if args.from_block is not None else read_cursor(args.state)
+    from_block, to_block = export_range(get_web3(), from_block, args.to_block)
+    if from_block > to_block:
+        print(f"Nothing to export: already up to block {from_block - 1}", file=sys.stderr)
+        return
+
+    binary = args.format == "parquet"
+    if not args.out:
+        out = sys.stdout.buffer if binary else sys.stdout
+    elif binary:
+        out = open(args.out, "wb")
+    else:
+        # The csv module writes its own line endings
+        out = open(args.out, "w", newline="", encoding="utf-8")
+    try:
+        for chunk in export(args.format, from_block, to_block):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+
+    if args.state:
+        write_cursor(args.state, to_block + 1)
+    print(f"Exported blocks {from_block} to {to_block}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
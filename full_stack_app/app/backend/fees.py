@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import statistics
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Settings
+FEE_HISTORY_BLOCKS = int(os.getenv("FEE_HISTORY_BLOCKS", "20"))
+# Blocks kept in the rolling fee model
+FEE_WINDOW_BLOCKS = int(os.getenv("FEE_WINDOW_BLOCKS", "100"))
+# Percentile of each block's priority fees sampled from eth_feeHistory
+FEE_REWARD_PERCENTILE = float(os.getenv("FEE_REWARD_PERCENTILE", "50"))
+# Percentile of the sampled priority fees, across the window, that we pay
+FEE_PRIORITY_PERCENTILE = int(os.getenv("FEE_PRIORITY_PERCENTILE", "60"))
+FEE_REFRESH_INTERVAL = float(os.getenv("FEE_REFRESH_INTERVAL", "12"))
+GAS_LIMIT_MULTIPLIER = float(os.getenv("GAS_LIMIT_MULTIPLIER", "1.2"))
+
+logger = logging.getLogger(__name__)
+
+
+class FeeOracle:
+    """
+    Rolling EIP-1559 fee model fed by eth_feeHistory. Reading the suggested
+    fees is a local operation; the node is only queried by refresh().
+    """
+
+    def __init__(self):
+        self.next_base_fee = None
+        self.gas_price = None
+        self.updated_at = 0.0
+        self._rewards = {}
+        self._lock = threading.Lock()
+
+    def update(self, fee_history):
+        """Add an eth_feeHistory response to the model."""
+        oldest = fee_history["oldestBlock"]
+        with self._lock:
+            for offset, rewards in enumerate(fee_history.get("reward") or []):
+                self._rewards[oldest + offset] = rewards[0]
+            for block in sorted(self._rewards)[:-FEE_WINDOW_BLOCKS]:
+                del self._rewards[block]
+            # The last base fee is the one of the next block
+            self.next_base_fee = fee_history["baseFeePerGas"][-1]
+            self.updated_at = time.monotonic()
+
+    def refresh(self, web3):
+        """Sample the latest blocks, falling back to gasPrice on pre-London nodes."""
+        try:
+            self.update(web3.eth.fee_history(FEE_HISTORY_BLOCKS, "latest", [FEE_REWARD_PERCENTILE]))
+        except Exception:
+            self.gas_price = web3.eth.gas_price
+            self.updated_at = time.monotonic()
+
+    async def async_refresh(self, web3):
+        """Same as refresh, for an AsyncWeb3 client."""
+        try:
+            self.update(await web3.eth.fee_history(FEE_HISTORY_BLOCKS, "latest", [FEE_REWARD_PERCENTILE]))
+        except Exception:
+            self.gas_price = await web3.eth.gas_price
+            self.updated_at = time.monotonic()
+
+    def is_ready(self):
+        return self.next_base_fee is not None or self.gas_price is not None
+
+    def priority_fee(self):
+        with self._lock:
+            rewards = list(self._rewards.values())
+        if not rewards:
+            return 0
+        if len(rewards) == 1:
+            return rewards[0]
+        return int(statistics.quantiles(rewards, n=100)[FEE_PRIORITY_PERCENTILE - 1])
+
+    def fee_params(self):
+        """Fee fields for a transaction: EIP-1559 when supported, legacy gasPrice otherwise."""
+        if self.next_base_fee is None:
+            return {"gasPrice": self.gas_price}
+        priority_fee = self.priority_fee()
+        return {
+            # Twice the base fee keeps the transaction valid for ~6 full blocks
+            "maxFeePerGas": 2 * self.next_base_fee + priority_fee,
+            "maxPriorityFeePerGas": priority_fee,
+        }
+
+
+fee_oracle = FeeOracle()
+
+
+async def run_fee_oracle(get_web3):
+    """Keep the fee model fresh for the whole app lifespan."""
+    while True:
+        try:
+            await asyncio.to_thread(fee_oracle.refresh, get_web3())
+        except Exception as e:
+            logger.warning("Fee oracle error: %s", e)
+        await asyncio.sleep(FEE_REFRESH_INTERVAL)
+
+
+def _arg_shape(value):
+    # Calldata, and so gas, grows with the size of dynamic arguments
+    if isinstance(value, (str, bytes)):
+        return (type(value).__name__, len(value) // 32)
+    if isinstance(value, (list, tuple)):
+        return ("list", tuple(_arg_shape(v) for v in value))
+    return type(value).__name__
+
+
+_gas_limits = {}
+
+
+def gas_cache_key(function, state=None):
+    """
+    Cache key of a contract call: its selector, the shape of its arguments and
+    `state`, the contract state its gas depends on (see integration.vote_gas_states).
+    """
+    return (function.address, function.signature, tuple(_arg_shape(arg) for arg in function.args), state)
+
+
+def estimate_gas(function, sender, default, state=None, block_identifier=None):
+    """
+    Cached gas limit for `function`, or `default` when the call cannot be
+    estimated. A `state` must be read at `block_identifier`, the block the
+    estimate runs against, so the estimate is cached under the right state.
+    """
+    key = gas_cache_key(function, state)
+    if key not in _gas_limits:
+        try:
+            _gas_limits[key] = int(
+                function.estimate_gas({"from": sender}, block_identifier) * GAS_LIMIT_MULTIPLIER
+            )
+        except Exception:
+            # Usually a call that would revert: do not cache, let the wallet show the error
+            return default
+    return _gas_limits[key]
+
+
+async def async_estimate_gas(function, sender, default, state=None, block_identifier=None):
+    """Same as estimate_gas, for an AsyncWeb3 contract function."""
+    key = gas_cache_key(function, state)
+    if key not in _gas_limits:
+        try:
+            _gas_limits[key] = int(
+                await function.estimate_gas({"from": sender}, block_identifier) * GAS_LIMIT_MULTIPLIER
+            )
+        except Exception:
+            return default
+    return _gas_limits[key]
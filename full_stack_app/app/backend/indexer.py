@@ -0,0 +1,381 @@
+import asyncio
+import logging
+import os
+import sqlite3
+from contextlib import closing
+import reflex as rx
+from hexbytes import HexBytes
+from dotenv import load_dotenv
+from .cache import read_cache
+from . import balances, queries, search, tallies
+
+load_dotenv()
+
+# Settings
+DB_PATH = rx.config.get_config().db_url.replace("sqlite:///", "")
+DAO_DEPLOY_BLOCK = int(os.getenv("DAO_DEPLOY_BLOCK", "0"))
+# The token is deployed before the DAO, so its history starts earlier
+TOKEN_DEPLOY_BLOCK = int(os.getenv("TOKEN_DEPLOY_BLOCK", "0"))
+# Blocks newer than head - CONFIRMATIONS are not indexed, so a reorg shallower
+# than this never touches the database
+INDEXER_CONFIRMATIONS = int(os.getenv("INDEXER_CONFIRMATIONS", "2"))
+INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", "6"))
+# Blocks the index may fall behind the confirmed head before reads go to the node again
+INDEXER_MAX_LAG = int(os.getenv("INDEXER_MAX_LAG", "10"))
+INDEXER_MIN_BLOCK_RANGE = int(os.getenv("INDEXER_MIN_BLOCK_RANGE", "10"))
+INDEXER_MAX_BLOCK_RANGE = int(os.getenv("INDEXER_MAX_BLOCK_RANGE", "5000"))
+# Grow the block range while a request returns less logs than this
+INDEXER_TARGET_LOGS = int(os.getenv("INDEXER_TARGET_LOGS", "1000"))
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "20"))
+# Only this many of the newest matches of a search are ranked
+SEARCH_RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "500"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposals (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    end_time INTEGER NOT NULL,
+    for_votes TEXT NOT NULL DEFAULT '0',
+    against_votes TEXT NOT NULL DEFAULT '0',
+    executed INTEGER NOT NULL DEFAULT 0,
+    proposer TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS votes (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    proposal_id INTEGER NOT NULL,
+    voter TEXT NOT NULL,
+    support INTEGER NOT NULL,
+    weight TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_votes_proposal ON votes (proposal_id);
+CREATE INDEX IF NOT EXISTS idx_votes_voter ON votes (voter);
+CREATE INDEX IF NOT EXISTS idx_proposals_executed ON proposals (executed, id);
+CREATE INDEX IF NOT EXISTS idx_proposals_status ON proposals (executed, end_time);
+CREATE INDEX IF NOT EXISTS idx_proposals_end_time ON proposals (end_time);
+CREATE INDEX IF NOT EXISTS idx_proposals_proposer ON proposals (proposer, id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    block INTEGER NOT NULL
+);
+"""
+
+CHECKPOINT = "dao"
+TOKEN_CHECKPOINT = "token"
+# Largest SQLite INTEGER. DAO.sol accepts end times up to 2**64 - 1; later
+# ones are stored as this, which is just as unreachable.
+MAX_END_TIME = 2 ** 63 - 1
+
+logger = logging.getLogger(__name__)
+
+_initialized = False
+_caught_up = False
+_balances_caught_up = False
+_block_range = INDEXER_MAX_BLOCK_RANGE
+# Confirmed head each checkpoint was last synced up to, in this process
+_synced_heads = {}
+
+
+def connect():
+    """Open a connection to the index database, creating the schema if needed."""
+    global _initialized
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.executescript(tallies.SCHEMA)
+        conn.executescript(search.SCHEMA)
+        conn.executescript(balances.SCHEMA)
+        tallies.backfill(conn)
+        search.backfill(conn)
+        _initialized = True
+    return conn
+
+
+def last_synced_block(conn, name=CHECKPOINT):
+    """Last block fully stored in the index, or None if it was never synced."""
+    row = conn.execute("SELECT block FROM sync_state WHERE name = ?", (name,)).fetchone()
+    return row["block"] if row else None
+
+
+def _is_current(name):
+    """
+    Whether the checkpoint `name` is at most INDEXER_MAX_LAG blocks behind the
+    confirmed head, as of the last head the app read from the node.
+    """
+    synced = _synced_heads.get(name)
+    if synced is None:
+        return False
+    return read_cache.head is None or read_cache.head - INDEXER_CONFIRMATIONS - synced <= INDEXER_MAX_LAG
+
+
+def is_ready():
+    """Whether the index caught up with the chain, and still keeps up, so it can serve reads."""
+    return _caught_up and _is_current(CHECKPOINT)
+
+
+def balances_ready():
+    """Whether the token balances are indexed and caught up too."""
+    return _balances_caught_up and _is_current(TOKEN_CHECKPOINT)
+
+
+def dao_events(contract):
+    """Events indexed from the DAO contract."""
+    return [
+        contract.events.ProposalCreated(),
+        contract.events.VoteCast(),
+        contract.events.ProposalExecuted(),
+    ]
+
+
+def store_logs(conn, contract, logs, to_block, name=CHECKPOINT):
+    """Decode and persist DAO logs and move the checkpoint to `to_block` atomically."""
+    events = {HexBytes(event.topic): event for event in dao_events(contract)}
+    with conn:
+        for log in logs:
+            event = events.get(HexBytes(log["topics"][0]))
+            if event is None:
+                continue
+            decoded = event.process_log(log)
+            args = decoded["args"]
+            block_number = decoded["blockNumber"]
+            tx_hash = decoded["transactionHash"].to_0x_hex()
+
+            if decoded["event"] == "ProposalCreated":
+                conn.execute(
+                    "INSERT OR IGNORE INTO proposals "
+                    "(id, title, description, end_time, proposer, block_number, tx_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        args["proposalId"],
+                        args["title"],
+                        args["description"],
+                        min(args["endTime"], MAX_END_TIME),
+                        args["proposer"],
+                        block_number,
+                        tx_hash,
+                    ),
+                )
+            elif decoded["event"] == "VoteCast":
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO votes "
+                    "(block_number, log_index, proposal_id, voter, support, weight, tx_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        block_number,
+                        decoded["logIndex"],
+                        args["proposalId"],
+                        args["voter"],
+                        int(args["support"]),
+                        str(args["weight"]),
+                        tx_hash,
+                    ),
+                ).rowcount
+                if inserted:
+                    tallies.apply_vote(conn, args["proposalId"], args["support"], args["weight"])
+            else:
+                conn.execute("UPDATE proposals SET executed = 1 WHERE id = ?", (args["proposalId"],))
+
+        conn.execute(
+            "INSERT INTO sync_state (name, block) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET block = excluded.block",
+            (name, to_block),
+        )
+
+
+def store_token_logs(conn, token_contract, logs, to_block, name=TOKEN_CHECKPOINT):
+    """Apply token Transfer logs to the balance index and move its checkpoint to `to_block` atomically."""
+    topic = HexBytes(token_contract.events.Transfer().topic)
+    with conn:
+        for log in logs:
+            if HexBytes(log["topics"][0]) != topic:
+                continue
+            sender, recipient, value = balances.decode_transfer(log)
+            balances.apply_transfer(conn, sender, recipient, value, log["blockNumber"], log["logIndex"])
+
+        conn.execute(
+            "INSERT INTO sync_state (name, block) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET block = excluded.block",
+            (name, to_block),
+        )
+
+
+def _sync_logs(conn, web3, address, topics, head, name, first_block, store):
+    """Fetch the logs of `address` from the checkpoint `name` up to `head` and pass each range to `store`."""
+    global _block_range
+    last = last_synced_block(conn, name)
+    start = first_block if last is None else last + 1
+
+    while start <= head:
+        end = min(start + _block_range - 1, head)
+        try:
+            logs = web3.eth.get_logs({
+                "address": address,
+                "fromBlock": start,
+                "toBlock": end,
+                "topics": topics,
+            })
+        except Exception:
+            # Most providers reject ranges with too many results: shrink and retry
+            if _block_range <= INDEXER_MIN_BLOCK_RANGE:
+                raise
+            _block_range = max(INDEXER_MIN_BLOCK_RANGE, _block_range // 2)
+            continue
+
+        store(conn, logs, end)
+        start = end + 1
+        if len(logs) < INDEXER_TARGET_LOGS:
+            _block_range = min(INDEXER_MAX_BLOCK_RANGE, _block_range * 2)
+    _synced_heads[name] = head
+
+
+def sync_once(web3, contract, token_contract=None):
+    """
+    Index every confirmed block since the last checkpoints, DAO events and
+    token transfers. Returns the new DAO checkpoint.
+    """
+    global _caught_up, _balances_caught_up
+    head = web3.eth.block_number - INDEXER_CONFIRMATIONS
+
+    with closing(connect()) as conn:
+        _sync_logs(
+            conn, web3, contract.address,
+            [[event.topic for event in dao_events(contract)]],
+            head, CHECKPOINT, DAO_DEPLOY_BLOCK,
+            lambda conn, logs, end: store_logs(conn, contract, logs, end),
+        )
+        if token_contract is not None:
+            _sync_logs(
+                conn, web3, token_contract.address,
+                [token_contract.events.Transfer().topic],
+                head, TOKEN_CHECKPOINT, TOKEN_DEPLOY_BLOCK,
+                lambda conn, logs, end: store_token_logs(conn, token_contract, logs, end),
+            )
+            _balances_caught_up = True
+
+        if not _caught_up:
+            # Table statistics let SQLite pick the right proposal index per query
+            conn.execute("ANALYZE")
+        _caught_up = True
+        return last_synced_block(conn)
+
+
+async def run_indexer(get_web3, get_contract, get_token_contract=None):
+    """Keep the index in sync for the whole app lifespan."""
+    while True:
+        try:
+            token_contract = get_token_contract() if get_token_contract else None
+            await asyncio.to_thread(sync_once, get_web3(), get_contract(), token_contract)
+        except Exception as e:
+            logger.warning("Indexer error: %s", e)
+        await asyncio.sleep(INDEXER_POLL_INTERVAL)
+
+
+def _proposal_dict(row):
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "description": row["description"],
+        "endTime": row["end_time"],
+        "forVotes": int(row["for_votes"]),
+        "againstVotes": int(row["against_votes"]),
+        "executed": bool(row["executed"]),
+        "proposer": row["proposer"],
+    }
+
+
+def indexed_proposals():
+    """All proposals from the local index, in the same format as list_proposals."""
+    with closing(connect()) as conn:
+        rows = conn.execute("SELECT * FROM proposals ORDER BY id").fetchall()
+    return [_proposal_dict(row) for row in rows]
+
+
+def _summary_dict(row):
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "endTime": row["end_time"],
+        "forVotes": int(row["for_votes"]),
+        "againstVotes": int(row["against_votes"]),
+        "executed": bool(row["executed"]),
+        "proposer": row["proposer"],
+    }
+
+
+def indexed_summaries(before=None, limit=None):
+    """
+    Proposals from the local index without their description: every proposal
+    in id order, or the `limit` newest ones with an id below `before`.
+    """
+    query = f"SELECT {queries.SUMMARY_COLUMNS} FROM proposals"
+    if limit is None:
+        query, params = query + " ORDER BY id", ()
+    else:
+        query += " WHERE id < ? ORDER BY id DESC LIMIT ?"
+        params = (before if before is not None else 2 ** 63 - 1, limit)
+    with closing(connect()) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [_summary_dict(row) for row in rows]
+
+
+def indexed_query(now, **filters):
+    """Proposal summaries matching `filters` (see queries.build_query), from the indexes."""
+    query, params = queries.build_query(now, **filters)
+    with closing(connect()) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [_summary_dict(row) for row in rows]
+
+
+def indexed_proposal(proposal_id):
+    """A proposal from the local index, in the same format as getProposal, or None."""
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT * FROM proposals WHERE id = ?", (proposal_id,)).fetchone()
+    if row is None:
+        return None
+    p = _proposal_dict(row)
+    return [
+        p["title"],
+        p["description"],
+        p["endTime"],
+        p["forVotes"],
+        p["againstVotes"],
+        p["executed"],
+        p["proposer"],
+    ]
+
+
+def indexed_search(text, limit=None):
+    """Ranked full-text search over the indexed proposal titles and descriptions."""
+    with closing(connect()) as conn:
+        return search.search(conn, text, limit or SEARCH_RESULTS_LIMIT, SEARCH_RANK_CANDIDATES)
+
+
+def indexed_balance(holder, block=None):
+    """Token balance of `holder` from the local index, at its last block or at `block`."""
+    with closing(connect()) as conn:
+        return balances.balance_of(conn, holder, block)
+
+
+def indexed_total_supply(block=None):
+    """Token total supply from the local index, at its last block or at `block`."""
+    with closing(connect()) as conn:
+        return balances.total_supply(conn, block)
+
+
+def indexed_top_holders(limit=10):
+    """Largest token holders from the local index."""
+    with closing(connect()) as conn:
+        return balances.top_holders(conn, limit)
+
+
+def indexed_tallies(proposal_ids):
+    """Vote aggregates of the given proposals from the local index, keyed by id."""
+    with closing(connect()) as conn:
+        return tallies.load_tallies(conn, proposal_ids)
@@ -1,8 +1,19 @@
 import reflex as rx
 from web3 import Web3
-import json
 import os
+import time
 from dotenv import load_dotenv
+from .abi_cache import load_abi
+from .providers import make_provider
+from .batch import BATCH_CHUNK_SIZE, batch_call
+from .cache import cached_call, cached_read, detail_cache, read_cache
+from .nonce import nonce_manager
+from .fees import fee_oracle, estimate_gas
+from .metrics import instrument
+from .bulk import batch_transactions
+from .balances import MIN_VOTING_POWER
+from .preflight import simulate
+from . import indexer, queries
 
 load_dotenv()
 
@@ -11,45 +22,159 @@ RPC_URL = os.getenv("RPC_URL")
 DAO_ADDRESS = os.getenv("DAO_ADDRESS")
 TOKEN_ADDRESS = os.getenv("TOKEN_ADDRESS")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
+# Titles longer than this are cut in the proposal list; the full one comes with the details
+SUMMARY_TITLE_LENGTH = int(os.getenv("SUMMARY_TITLE_LENGTH", "80"))
+PROPOSAL_PAGE_SIZE = int(os.getenv("PROPOSAL_PAGE_SIZE", "20"))
+# Proposals read per getProposals call, when the deployed DAO has that view
+SUMMARY_VIEW_SIZE = int(os.getenv("SUMMARY_VIEW_SIZE", "100"))
+
+SUMMARY_VIEW_SELECTOR = bytes(Web3.keccak(text="getProposals(uint256,uint256)")[:4])
+# Whether the DAO deployed at each address has getProposals, checked once
+summary_views = {}
+
+# Client and contract instances, created on first use so importing this module
+# (reflex compile, hot reload, worker forks) does no network I/O
+_client = {}
+
+
+def get_web3():
+    """Conection to the blockchain."""
+    if "web3" not in _client:
+        _client.setdefault("web3", instrument(Web3(make_provider(RPC_URL))))
+    return _client["web3"]
+
+
+def get_dao_contract():
+    """DAO contract instance."""
+    if "dao_contract" not in _client:
+        contract = get_web3().eth.contract(address=DAO_ADDRESS, abi=load_abi("DAO.sol"))
+        _client.setdefault("dao_contract", contract)
+    return _client["dao_contract"]
+
+
+def get_token_contract():
+    """Token contract instance."""
+    if "token_contract" not in _client:
+        contract = get_web3().eth.contract(address=TOKEN_ADDRESS, abi=load_abi("TokenDAO.sol"))
+        _client.setdefault("token_contract", contract)
+    return _client["token_contract"]
+
+
+def pending_transaction_count(address):
+    """Transaction count of `address` including its pending transactions."""
+    return get_web3().eth.get_transaction_count(address, "pending")
+
+def transaction_params(function, sender_address, nonce, default_gas, gas_state=None, block_number=None):
+    """
+    Gas limit and fees for `function`, from the fee oracle and the gas cache.
+    A `gas_state` must be read at `block_number` (see fees.estimate_gas).
+    """
+    sender = Web3.to_checksum_address(sender_address)
+    if not fee_oracle.is_ready():
+        fee_oracle.refresh(get_web3())
+    return {
+        'from': sender,
+        'nonce': nonce,
+        'gas': estimate_gas(function, sender, default_gas, gas_state, block_number),
+        **fee_oracle.fee_params(),
+    }
+
+def vote_gas_state(proposal, support):
+    """
+    Whether a castVote adds to a tally that is still zero. Writing a zero slot
+    costs ~17k gas more than updating one, more than the estimate margin, so
+    the two cases get separate gas cache entries. `proposal` must come from
+    the node at the block of the estimate, never from the lagging index.
+    """
+    return (proposal[3] if support else proposal[4]) == 0
+
+def vote_gas_states(calls, block_number):
+    """vote_gas_state of each (proposal_id, support) call at `block_number`, in one batched read."""
+    dao_contract = get_dao_contract()
+    proposals = batch_call(
+        get_web3(),
+        [dao_contract.functions.getProposal(i) for i, _ in calls],
+        block_identifier=block_number,
+    )
+    return [vote_gas_state(p, support) for p, (_, support) in zip(proposals, calls)]
+
+def gas_states(fn_name, calls, block_number):
+    """Gas cache state of each call of `fn_name`; only castVote depends on the contract state."""
+    if fn_name == "castVote":
+        return vote_gas_states(calls, block_number)
+    return [None] * len(calls)
+
+def voting_power(address):
+    """Token balance of `address`, which is the weight of its votes."""
+    address = Web3.to_checksum_address(address)
+    if indexer.balances_ready():
+        power = indexer.indexed_balance(address)
+        # The index stops a few blocks behind the head: a low balance is confirmed with the node
+        if power >= MIN_VOTING_POWER:
+            return power
+    return cached_call(get_web3(), get_token_contract().functions.balanceOf(address))
+
+
+def require_voting_power(address):
+    """Raise when `address` holds less tokens than DAO.sol requires to create proposals and vote."""
+    if voting_power(address) < MIN_VOTING_POWER:
+        raise Exception("Insufficient tokens: at least 1 BCI is required to create proposals and vote.")
+
+def simulate_calls(calls, sender_address):
+    """
+    Revert reason of each DAO (fn_name, args) call from `sender_address`
+    against the pending state, or None when it would succeed. One batched
+    request, cached per block.
+    """
+    web3 = get_web3()
+    sender = Web3.to_checksum_address(sender_address)
+    return simulate(web3, get_dao_contract(), sender, calls, read_cache.current_block(web3))
+
+
+def preflight_error(calls, reasons):
+    """Message for the calls that would revert, or None when they all succeed."""
+    failed = [(args, reason) for (_, args), reason in zip(calls, reasons) if reason is not None]
+    if not failed:
+        return None
+    if len(calls) == 1:
+        return f"The transaction would revert: {failed[0][1]}"
+    return "The transactions would revert: " + "; ".join(
+        f"proposal #{args[0]}: {reason}" for args, reason in failed
+    )
+
+
+def preflight(calls, sender_address):
+    """Raise before anything is built or signed when one of `calls` would revert."""
+    error = preflight_error(calls, simulate_calls(calls, sender_address))
+    if error:
+        raise Exception(error)
+
+
+def proposal_verdicts(proposal_ids, sender_address):
+    """
+    Why voting on or executing each proposal would revert for `sender_address`
+    ("" when it would not), keyed by id, all simulated in one request.
+    """
+    ids = list(proposal_ids)
+    calls = [call for i in ids for call in (("castVote", (i, True)), ("executeProposal", (i,)))]
+    reasons = simulate_calls(calls, sender_address)
+    return {
+        str(i): {"vote": reasons[2 * n] or "", "execute": reasons[2 * n + 1] or ""}
+        for n, i in enumerate(ids)
+    }
 
-# Conection to the blockchain
-web3 = Web3(Web3.HTTPProvider(RPC_URL))
-if not web3.is_connected():
-    raise Exception("Failed to connect to the blockchain.")
-
-# function to load the ABI of a contract
-def load_abi(contract_name:str):
-    abi_path = os.path.join("../out", contract_name, f"{contract_name.strip('.sol')}.json")
-    if not os.path.exists(abi_path):
-        raise FileNotFoundError(f"ABI não encontrada para {contract_name} em {abi_path}.")
-    with open(abi_path, 'r') as f:
-        artifact = json.load(f)
-        if "abi" not in artifact:
-            raise KeyError(f"'abi' não encontrado no arquivo {abi_path}.")
-        return artifact["abi"]
-
-# Contract ABIs
-dao_abi = load_abi("DAO.sol")
-token_abi = load_abi("TokenDAO.sol")
-
-# Contract instances
-dao_contract = web3.eth.contract(address=DAO_ADDRESS, abi=dao_abi)
-token_contract = web3.eth.contract(address=TOKEN_ADDRESS, abi=token_abi)
-    
 # Funções de interação com os contratos
 def create_proposal(title, description, voting_period, sender_address):
     """Create a proposal on the DAO."""
     try:
+        require_voting_power(sender_address)
+        preflight([("createProposal", (title, description, voting_period))], sender_address)
         # First create proposal on blockchain
-        nonce = web3.eth.get_transaction_count(Web3.to_checksum_address(sender_address))
-        tx = dao_contract.functions.createProposal(
-            title, description, voting_period
-        ).build_transaction({
-            'from': Web3.to_checksum_address(sender_address),
-            'nonce': nonce,
-            'gas': 2000000,
-            'gasPrice': web3.to_wei('20', 'gwei'),
-        })
+        nonce = nonce_manager.next_nonce(sender_address, pending_transaction_count)
+        function = get_dao_contract().functions.createProposal(title, description, voting_period)
+        tx = function.build_transaction(
+            transaction_params(function, sender_address, nonce, 2000000)
+        )
         
         return tx
     
@@ -59,14 +184,17 @@ def create_proposal(title, description, voting_period, sender_address):
 def vote(proposal_id, support, sender_address):
     """Cast a vote on a proposal."""
     try:
+        require_voting_power(sender_address)
+        preflight([("castVote", (proposal_id, support))], sender_address)
+        # The gas state and the estimate are read at the same block
+        block_number = read_cache.current_block(get_web3())
+        gas_state = vote_gas_states([(proposal_id, support)], block_number)[0]
         # Execute blockchain transaction
-        nonce = web3.eth.get_transaction_count(Web3.to_checksum_address(sender_address))
-        tx = dao_contract.functions.castVote(proposal_id, support).build_transaction({
-            'from': Web3.to_checksum_address(sender_address),
-            'nonce': nonce,
-            'gas': 2000000,
-            'gasPrice': web3.to_wei('20', 'gwei')
-        })
+        nonce = nonce_manager.next_nonce(sender_address, pending_transaction_count)
+        function = get_dao_contract().functions.castVote(proposal_id, support)
+        tx = function.build_transaction(
+            transaction_params(function, sender_address, nonce, 2000000, gas_state, block_number)
+        )
 
         return tx
     
@@ -77,13 +205,12 @@ def vote(proposal_id, support, sender_address):
 def execute_proposal(proposal_id, sender_address):
     """Execeute a proposal."""
     try:
-        nonce = web3.eth.get_transaction_count(Web3.to_checksum_address(sender_address))
-        tx = dao_contract.functions.executeProposal(proposal_id).build_transaction({
-            'from': Web3.to_checksum_address(sender_address),
-            'nonce': nonce,
-            'gas': 3000000,
-            'gasPrice': web3.to_wei('20', 'gwei')
-        })
+        preflight([("executeProposal", (proposal_id,))], sender_address)
+        nonce = nonce_manager.next_nonce(sender_address, pending_transaction_count)
+        function = get_dao_contract().functions.executeProposal(proposal_id)
+        tx = function.build_transaction(
+            transaction_params(function, sender_address, nonce, 3000000)
+        )
     
         return tx
     
@@ -91,25 +218,255 @@ def execute_proposal(proposal_id, sender_address):
         return rx.window_alert(f"Error executing proposal: {str(e)}")
 
 
+def _build_batch(fn_name, calls, sender_address, default_gas):
+    sender = Web3.to_checksum_address(sender_address)
+    if not calls:
+        return []
+    nonces = nonce_manager.next_nonces(sender, len(calls), pending_transaction_count)
+    try:
+        dao_contract = get_dao_contract()
+        # Gas states and estimates are read at the same block
+        block_number = read_cache.current_block(get_web3())
+        states = gas_states(fn_name, calls, block_number)
+        # Same fees and chain id for every transaction of the batch, and one
+        # gas estimate per gas state
+        gas_limits = {}
+        for args, state in zip(calls, states):
+            if state not in gas_limits:
+                gas_limits[state] = transaction_params(
+                    dao_contract.functions[fn_name](*args), sender, nonces[0], default_gas, state, block_number
+                )["gas"]
+        return batch_transactions(
+            dao_contract, fn_name, calls, sender, nonces, [gas_limits[state] for state in states],
+            get_web3().eth.chain_id, fee_oracle.fee_params(),
+        )
+    except Exception:
+        for nonce in reversed(nonces):
+            nonce_manager.release(sender, nonce)
+        raise
+
+
+def bulk_vote(votes, sender_address):
+    """Cast votes on many proposals: one transaction per (proposal_id, support) pair, in order."""
+    try:
+        calls = [(int(proposal_id), bool(support)) for proposal_id, support in votes]
+        require_voting_power(sender_address)
+        preflight([("castVote", args) for args in calls], sender_address)
+        return _build_batch("castVote", calls, sender_address, 2000000)
+    except Exception as e:
+        raise Exception(f"Failed to cast the votes. {str(e)}")
+
+
+def bulk_execute(proposal_ids, sender_address):
+    """Execute many proposals: one transaction per proposal, in order."""
+    try:
+        calls = [(int(proposal_id),) for proposal_id in proposal_ids]
+        preflight([("executeProposal", args) for args in calls], sender_address)
+        return _build_batch("executeProposal", calls, sender_address, 3000000)
+    except Exception as e:
+        raise Exception(f"Failed to execute the proposals. {str(e)}")
+
+
 def get_proposal(proposal_id):
     """Get proposal details."""
-    return dao_contract.functions.getProposal(proposal_id).call()
+    if indexer.is_ready():
+        proposal = indexer.indexed_proposal(proposal_id)
+        if proposal is not None:
+            return proposal
+    return cached_call(get_web3(), get_dao_contract().functions.getProposal(proposal_id))
 
 def list_proposals():
-    """List all proposals."""
-    proposal_count = dao_contract.functions.proposalCount().call()
-    proposals = []
-    for i in range(1, proposal_count + 1):
-        p = dao_contract.functions.getProposal(i).call()
-        proposals.append({
-            "id": i,
-            "title": p[0],
-            "description": p[1],
-            "endTime": p[2],
-            "forVotes": p[3],
-            "againstVotes": p[4],
-            "executed": p[5],
-            "proposer": p[6],
+    """List all proposals as summaries (see proposal_summary)."""
+    proposals = cached_read(
+        get_web3(), (get_dao_contract().address, "list_proposals", ()), _load_proposals
+    )
+    # Copy the entries so a session never mutates the shared cached list
+    return [dict(p) for p in proposals]
+
+def _load_proposals(block_number):
+    if indexer.is_ready():
+        return [proposal_summary(p) for p in indexer.indexed_summaries()]
+
+    dao_contract = get_dao_contract()
+    proposal_count = dao_contract.functions.proposalCount().call(block_identifier=block_number)
+    ids = range(1, proposal_count + 1)
+    if has_summary_view(dao_contract):
+        return read_summaries(dao_contract, ids, block_number)
+    results = batch_call(
+        get_web3(),
+        [dao_contract.functions.getProposal(i) for i in ids],
+        block_identifier=block_number,
+    )
+    proposals = [proposal_dict(i, p) for i, p in zip(ids, results)]
+    # getProposal returned the descriptions anyway
+    for proposal in proposals:
+        cache_detail(proposal)
+    return [proposal_summary(p) for p in proposals]
+
+def page_ids(proposal_count, cursor, limit):
+    """Ids of a page, newest first: the `limit` ids below `cursor` (or below the count + 1)."""
+    top = proposal_count if cursor is None else min(cursor - 1, proposal_count)
+    return list(range(top, max(top - limit, 0), -1))
+
+def next_cursor(ids):
+    """Cursor of the page after `ids`, or None when it was the last one."""
+    return ids[-1] if ids and ids[-1] > 1 else None
+
+def list_proposal_page(cursor=None, limit=None):
+    """
+    One page of proposal summaries, newest first, and the cursor of the next
+    page (None on the last page). `cursor` is the last id of the previous page.
+    """
+    limit = limit or PROPOSAL_PAGE_SIZE
+    dao_contract = get_dao_contract()
+
+    def load(block_number):
+        if indexer.is_ready():
+            return [proposal_summary(p) for p in indexer.indexed_summaries(cursor, limit)]
+        proposal_count = dao_contract.functions.proposalCount().call(block_identifier=block_number)
+        ids = page_ids(proposal_count, cursor, limit)
+        if has_summary_view(dao_contract):
+            return read_summaries(dao_contract, ids, block_number)
+        results = batch_call(
+            get_web3(),
+            [dao_contract.functions.getProposal(i) for i in ids],
+            block_identifier=block_number,
+        )
+        proposals = [proposal_dict(i, p) for i, p in zip(ids, results)]
+        for proposal in proposals:
+            cache_detail(proposal)
+        return [proposal_summary(p) for p in proposals]
+
+    page = cached_read(get_web3(), (dao_contract.address, "proposal_page", (cursor, limit)), load)
+    return [dict(p) for p in page], next_cursor([p["id"] for p in page])
+
+def query_proposals(status=None, ending_within=None, proposer=None, sort="newest", cursor=None, limit=None):
+    """
+    Filtered and sorted page of proposal summaries, and the cursor of the next
+    page. `status` is "active", "ended" or "executed", `ending_within` a number
+    of seconds and `sort` one of queries.SORTS. Answered by the index; while
+    it catches up, by the proposal list cached for the current block.
+    """
+    limit = limit or PROPOSAL_PAGE_SIZE
+    if status is None and ending_within is None and proposer is None and sort == "newest":
+        return list_proposal_page(cursor, limit)
+    filters = dict(
+        status=status, ending_within=ending_within, proposer=proposer,
+        sort=sort, cursor=cursor, limit=limit,
+    )
+    now = int(time.time())
+    if indexer.is_ready():
+        page = [proposal_summary(p) for p in indexer.indexed_query(now, **filters)]
+    else:
+        page = queries.filter_proposals(list_proposals(), now, **filters)
+    return page, queries.next_query_cursor(page, sort, limit)
+
+def get_proposal_detail(proposal_id):
+    """Full title, description and proposer of a proposal, from the detail cache."""
+    detail = detail_cache.get(proposal_id)
+    if detail is None:
+        detail = cache_detail(proposal_dict(proposal_id, get_proposal(proposal_id)))
+    return detail
+
+def proposal_dict(proposal_id, p):
+    """Convert a getProposal result to the dict used by the frontend."""
+    return {
+        "id": proposal_id,
+        "title": p[0],
+        "description": p[1],
+        "endTime": p[2],
+        "forVotes": p[3],
+        "againstVotes": p[4],
+        "executed": p[5],
+        "proposer": p[6],
+    }
+
+def abi_has_summary_view(dao_contract):
+    """Whether the loaded DAO ABI lists the getProposals view."""
+    return any(entry.get("name") == "getProposals" for entry in dao_contract.abi)
+
+def code_has_summary_view(code):
+    """Whether deployed bytecode dispatches the getProposals selector."""
+    return SUMMARY_VIEW_SELECTOR in bytes(code)
+
+def has_summary_view(dao_contract):
+    """
+    Whether the deployed DAO has the getProposals view, which reads many
+    summaries in one call. The ABI may come from a newer build than the
+    deployment, so the deployed code is checked once per address.
+    """
+    address = dao_contract.address
+    if address not in summary_views:
+        summary_views[address] = abi_has_summary_view(dao_contract) and code_has_summary_view(
+            dao_contract.w3.eth.get_code(address)
+        )
+    return summary_views[address]
+
+def summary_view_calls(dao_contract, ids):
+    """getProposals calls covering the consecutive `ids`, SUMMARY_VIEW_SIZE proposals each."""
+    if not ids:
+        return []
+    first, last = min(ids), max(ids)
+    return [
+        dao_contract.functions.getProposals(start, min(SUMMARY_VIEW_SIZE, last - start + 1))
+        for start in range(first, last + 1, SUMMARY_VIEW_SIZE)
+    ]
+
+def summaries_by_id(results):
+    """Proposal summaries of getProposals results, keyed by id."""
+    return {
+        s[0]: proposal_summary({
+            "id": s[0],
+            "title": s[1],
+            "endTime": s[2],
+            "forVotes": s[3],
+            "againstVotes": s[4],
+            "executed": s[5],
+            # Multicall decoding leaves addresses nested in tuples lowercase
+            "proposer": Web3.to_checksum_address(s[6]),
         })
-    return proposals
+        for result in results for s in result
+    }
+
+def read_summaries(dao_contract, ids, block_number):
+    """
+    Summaries of the consecutive `ids`, in their order, with getProposals.
+    Descriptions are left out, so nothing goes to the detail cache.
+    """
+    # A multicall still holds BATCH_CHUNK_SIZE proposals, not that many getProposals calls
+    results = batch_call(
+        get_web3(),
+        summary_view_calls(dao_contract, ids),
+        chunk_size=max(1, BATCH_CHUNK_SIZE // SUMMARY_VIEW_SIZE),
+        block_identifier=block_number,
+    )
+    summaries = summaries_by_id(results)
+    return [summaries[i] for i in ids]
+
+def proposal_summary(proposal):
+    """The fields of a proposal shown in the list, with its title cut to SUMMARY_TITLE_LENGTH."""
+    title = proposal["title"]
+    if len(title) > SUMMARY_TITLE_LENGTH:
+        title = title[:SUMMARY_TITLE_LENGTH - 1] + "…"
+    return {
+        "id": proposal["id"],
+        "title": title,
+        "endTime": proposal["endTime"],
+        "forVotes": proposal["forVotes"],
+        "againstVotes": proposal["againstVotes"],
+        "executed": proposal["executed"],
+        "proposer": proposal["proposer"],
+    }
 
+def cache_detail(proposal):
+    """Keep the fields left out of the summary of a full proposal dict in the detail cache."""
+    detail = {
+        "id": proposal["id"],
+        "title": proposal["title"],
+        "description": proposal["description"],
+        "proposer": proposal["proposer"],
+    }
+    # Ids past proposalCount read as an empty proposal: never cache those
+    if int(proposal["proposer"], 16):
+        detail_cache.set(proposal["id"], detail)
+    return detail
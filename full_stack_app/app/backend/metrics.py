@@ -0,0 +1,264 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from starlette.responses import PlainTextResponse
+from web3.middleware import Web3Middleware
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Settings
+# Off by default: nothing is wrapped or recorded unless this is set
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HELP = {
+    "dao_rpc_requests_total": ("counter", "JSON-RPC requests sent to the node."),
+    "dao_rpc_errors_total": ("counter", "JSON-RPC requests that raised or returned an error."),
+    "dao_rpc_duration_seconds": ("histogram", "Time waiting for the node, per JSON-RPC method."),
+    "dao_rpc_request_bytes": ("histogram", "Size of the JSON-encoded request params."),
+    "dao_rpc_response_bytes": ("histogram", "Size of the JSON-encoded response."),
+    "dao_section_duration_seconds": ("histogram", "Time spent in instrumented backend sections, such as ABI decoding."),
+    "dao_handler_duration_seconds": ("histogram", "Duration of ProposalState event handlers."),
+    "dao_handler_errors_total": ("counter", "ProposalState event handlers that raised."),
+}
+
+
+class Histogram:
+    """Cumulative Prometheus histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+_counters = {}
+_histograms = {}
+# Callables yielding extra (name, type, help, labels, value) samples, read at scrape time
+_collectors = []
+_lock = threading.Lock()
+
+
+def inc(name, labels=(), value=1):
+    with _lock:
+        key = (name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, labels, value, buckets=LATENCY_BUCKETS):
+    with _lock:
+        key = (name, labels)
+        if key not in _histograms:
+            _histograms[key] = Histogram(buckets)
+        _histograms[key].observe(value)
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+
+
+@contextmanager
+def timed(section):
+    """Record the time spent in a block of backend code."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("dao_section_duration_seconds", (("section", section),), time.perf_counter() - start)
+
+
+def _payload_size(payload):
+    try:
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _record_rpc(method, params, response, elapsed):
+    labels = (("method", method),)
+    inc("dao_rpc_requests_total", labels)
+    observe("dao_rpc_duration_seconds", labels, elapsed)
+    observe("dao_rpc_request_bytes", labels, _payload_size(params), SIZE_BUCKETS)
+    if response is None or "error" in response:
+        inc("dao_rpc_errors_total", labels)
+    else:
+        observe("dao_rpc_response_bytes", labels, _payload_size(response), SIZE_BUCKETS)
+
+
+class RPCMetricsMiddleware(Web3Middleware):
+    """Per-method counts, latency, payload sizes and errors of every JSON-RPC request."""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            start = time.perf_counter()
+            response = None
+            try:
+                response = make_request(method, params)
+                return response
+            finally:
+                _record_rpc(method, params, response, time.perf_counter() - start)
+
+        return middleware
+
+    def wrap_make_batch_request(self, make_batch_request):
+        def middleware(requests_info):
+            start = time.perf_counter()
+            responses = None
+            try:
+                responses = make_batch_request(requests_info)
+                return responses
+            finally:
+                _record_batch(requests_info, responses, time.perf_counter() - start)
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            start = time.perf_counter()
+            response = None
+            try:
+                response = await make_request(method, params)
+                return response
+            finally:
+                _record_rpc(method, params, response, time.perf_counter() - start)
+
+        return middleware
+
+    async def async_wrap_make_batch_request(self, make_batch_request):
+        async def middleware(requests_info):
+            start = time.perf_counter()
+            responses = None
+            try:
+                responses = await make_batch_request(requests_info)
+                return responses
+            finally:
+                _record_batch(requests_info, responses, time.perf_counter() - start)
+
+        return middleware
+
+
+def _record_batch(requests_info, responses, elapsed):
+    # One round trip: every request in it is charged its share of the latency
+    if not isinstance(responses, list):
+        responses = [responses] * len(requests_info)
+    for (method, params), response in zip(requests_info, responses):
+        _record_rpc(method, params, response, elapsed / max(len(requests_info), 1))
+
+
+def instrument(web3):
+    """Add the RPC metrics middleware to a Web3 or AsyncWeb3 client when metrics are enabled."""
+    if METRICS_ENABLED:
+        # Innermost layer, so the latency is the node's and not web3's formatting
+        web3.middleware_onion.inject(RPCMetricsMiddleware, "rpc_metrics", layer=0)
+    return web3
+
+
+def timed_handler(fn):
+    """
+    Time an event handler (sync, async or async generator). Returns `fn`
+    untouched when metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return fn
+    labels = (("handler", fn.__qualname__),)
+
+    def record(start, failed):
+        observe("dao_handler_duration_seconds", labels, time.perf_counter() - start)
+        if failed:
+            inc("dao_handler_errors_total", labels)
+
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start, failed = time.perf_counter(), True
+            try:
+                async for update in fn(*args, **kwargs):
+                    yield update
+                failed = False
+            finally:
+                record(start, failed)
+    elif inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start, failed = time.perf_counter(), True
+            try:
+                result = await fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                record(start, failed)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start, failed = time.perf_counter(), True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                record(start, failed)
+    return wrapper
+
+
+def _labels_text(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {
+            key: (h.buckets, list(h.counts), h.count, h.sum) for key, h in _histograms.items()
+        }
+    samples = {}
+    for (name, labels), value in counters.items():
+        samples.setdefault(name, []).append(f"{name}{_labels_text(labels)} {value}")
+    for (name, labels), (buckets, counts, count, total) in histograms.items():
+        lines = samples.setdefault(name, [])
+        for bound, bucket_count in zip(buckets, counts):
+            lines.append(f"{name}_bucket{_labels_text(labels, (('le', bound),))} {bucket_count}")
+        lines.append(f"{name}_bucket{_labels_text(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_labels_text(labels)} {total}")
+        lines.append(f"{name}_count{_labels_text(labels)} {count}")
+
+    output = []
+    for name in sorted(samples):
+        kind, description = HELP.get(name, ("untyped", name))
+        output += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", *samples[name]]
+    for collector in _collectors:
+        for name, kind, description, labels, value in collector():
+            output += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", f"{name}{_labels_text(labels)} {value}"]
+    return "\n".join(output) + "\n"
+
+
+async def metrics_endpoint():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+def mount(rx_app):
+    """Serve the metrics at METRICS_PATH on the Reflex backend when enabled."""
+    if METRICS_ENABLED:
+        rx_app.api.add_api_route(METRICS_PATH, metrics_endpoint, methods=["GET"])
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from web3 import Web3
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Settings
+# Seconds a locally tracked nonce is trusted before asking the node again
+NONCE_RESYNC_INTERVAL = float(os.getenv("NONCE_RESYNC_INTERVAL", "60"))
+# Seconds after which an issued nonce that never showed up on the node is
+# considered abandoned (e.g. the wallet window was closed)
+NONCE_IN_FLIGHT_TTL = float(os.getenv("NONCE_IN_FLIGHT_TTL", "300"))
+
+
+class NonceManager:
+    """
+    Per-address nonce tracker. Nonces are handed out locally and the node is
+    only asked for the `pending` transaction count when an address is new,
+    its data is older than NONCE_RESYNC_INTERVAL, or a nonce was given back
+    out of order.
+    """
+
+    def __init__(self, resync_interval=NONCE_RESYNC_INTERVAL, in_flight_ttl=NONCE_IN_FLIGHT_TTL):
+        self.resync_interval = resync_interval
+        self.in_flight_ttl = in_flight_ttl
+        self._next = {}
+        self._synced_at = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def needs_sync(self, address):
+        with self._lock:
+            synced_at = self._synced_at.get(address)
+            return synced_at is None or time.monotonic() - synced_at >= self.resync_interval
+
+    def sync(self, address, pending_count):
+        """Merge the node's pending transaction count with the nonces issued locally."""
+        now = time.monotonic()
+        with self._lock:
+            in_flight = {
+                nonce: issued_at
+                for nonce, issued_at in self._in_flight.get(address, {}).items()
+                if nonce >= pending_count and now - issued_at < self.in_flight_ttl
+            }
+            self._in_flight[address] = in_flight
+            # Skip the nonces still in flight, but never leave a hole behind them
+            next_nonce = pending_count
+            while next_nonce in in_flight:
+                next_nonce += 1
+            self._next[address] = next_nonce
+            self._synced_at[address] = now
+
+    def reserve(self, address):
+        """Hand out the next nonce of an already synced address."""
+        with self._lock:
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            self._in_flight.setdefault(address, {})[nonce] = time.monotonic()
+            return nonce
+
+    def reserve_many(self, address, count):
+        """Hand out `count` consecutive nonces of an already synced address."""
+        with self._lock:
+            first = self._next[address]
+            self._next[address] = first + count
+            in_flight = self._in_flight.setdefault(address, {})
+            now = time.monotonic()
+            for nonce in range(first, first + count):
+                in_flight[nonce] = now
+            return list(range(first, first + count))
+
+    def release(self, address, nonce):
+        """Give back a nonce whose transaction was never sent."""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            self._in_flight.get(address, {}).pop(nonce, None)
+            if self._next.get(address) == nonce + 1:
+                self._next[address] = nonce
+            else:
+                # A hole in the sequence: let the node tell us where we are
+                self._synced_at.pop(address, None)
+
+    def next_nonce(self, address, get_pending_count):
+        """Next nonce for `address`, calling `get_pending_count(address)` only when needed."""
+        address = Web3.to_checksum_address(address)
+        if self.needs_sync(address):
+            self.sync(address, get_pending_count(address))
+        return self.reserve(address)
+
+    async def async_next_nonce(self, address, get_pending_count):
+        """Same as next_nonce, with a coroutine `get_pending_count`."""
+        address = Web3.to_checksum_address(address)
+        if self.needs_sync(address):
+            self.sync(address, await get_pending_count(address))
+        return self.reserve(address)
+
+    def next_nonces(self, address, count, get_pending_count):
+        """`count` consecutive nonces for a batch of transactions from `address`."""
+        address = Web3.to_checksum_address(address)
+        if self.needs_sync(address):
+            self.sync(address, get_pending_count(address))
+        return self.reserve_many(address, count)
+
+    async def async_next_nonces(self, address, count, get_pending_count):
+        """Same as next_nonces, with a coroutine `get_pending_count`."""
+        address = Web3.to_checksum_address(address)
+        if self.needs_sync(address):
+            self.sync(address, await get_pending_count(address))
+        return self.reserve_many(address, count)
+
+
+nonce_manager = NonceManager()
@@ -0,0 +1,153 @@
+import asyncio
+import os
+from eth_abi import decode
+from web3.exceptions import ContractCustomError, ContractLogicError
+from dotenv import load_dotenv
+from .batch import (
+    BATCH_CHUNK_SIZE,
+    BatchRejected,
+    async_raw_batch_request,
+    chunked,
+    is_unsupported,
+    raw_batch_request,
+)
+from .bulk import encode_calldata
+from .cache import BlockCache
+
+load_dotenv()
+
+# Settings
+PREFLIGHT_CACHE_SIZE = int(os.getenv("PREFLIGHT_CACHE_SIZE", "4096"))
+
+# Selector of Error(string), the revert data of a require() with a message
+ERROR_SELECTOR = "0x08c379a0"
+# Cached verdict of a call that succeeds (None means "not cached")
+OK = ""
+# JSON-RPC error code of a reverted eth_call
+EXECUTION_REVERTED = 3
+
+# (contract, function, args, sender, block) -> revert reason, or OK
+verdict_cache = BlockCache(maxsize=PREFLIGHT_CACHE_SIZE)
+# Cleared when the node or provider does not support JSON-RPC batches
+_batch_supported = [True]
+
+
+def is_revert(error):
+    """
+    Whether a JSON-RPC eth_call error is a revert of the call, and not a
+    failure of the request (rate limit, timeout...) that says nothing about it.
+    """
+    message = str(error.get("message") or "").lower()
+    return error.get("code") == EXECUTION_REVERTED or "data" in error or "execution reverted" in message
+
+
+def revert_reason(error):
+    """Readable reason of a JSON-RPC eth_call error: the require() message when there is one."""
+    data = error.get("data")
+    if isinstance(data, dict):
+        # Some nodes nest the revert data one level deeper
+        data = data.get("data")
+    if isinstance(data, str) and data.startswith(ERROR_SELECTOR):
+        try:
+            return decode(["string"], bytes.fromhex(data[len(ERROR_SELECTOR):]))[0]
+        except Exception:
+            pass
+    message = error.get("message") or "execution reverted"
+    return message.removeprefix("execution reverted: ")
+
+
+def _exception_reason(e):
+    message = getattr(e, "message", None) or str(e)
+    return message.removeprefix("execution reverted: ")
+
+
+def _keys(contract, sender, calls, block_number):
+    return [(contract.address, fn_name, tuple(args), sender, block_number) for fn_name, args in calls]
+
+
+def _call_params(contract, sender, fn_name, args):
+    return {"from": sender, "to": contract.address, "data": encode_calldata(contract, fn_name, args)}
+
+
+def _verdicts(keys, found):
+    return [None if found[key] == OK else found[key] for key in keys]
+
+
+def _batch_verdicts(responses):
+    errors = [r["error"] for r in responses if "error" in r]
+    for error in errors:
+        if not is_revert(error):
+            # Not a verdict: never cache it, the chunk is simulated call by call
+            raise BatchRejected(error)
+    return [revert_reason(r["error"]) if "error" in r else OK for r in responses]
+
+
+def simulate(web3, contract, sender, calls, block_number):
+    """
+    Revert reason of each (fn_name, args) in `calls` sent by `sender` against
+    the pending state, or None when it would succeed. Calls not cached for
+    `block_number` go to the node in a single JSON-RPC batch.
+    """
+    verdict_cache.set_head(block_number)
+    keys = _keys(contract, sender, calls, block_number)
+    found = {key: verdict_cache.get(key) for key in keys}
+    missing = [(key, call) for key, call in zip(keys, calls) if found[key] is None]
+
+    for chunk in chunked(missing, BATCH_CHUNK_SIZE):
+        params = [_call_params(contract, sender, fn_name, args) for _, (fn_name, args) in chunk]
+        verdicts = None
+        if _batch_supported[0]:
+            try:
+                responses = raw_batch_request(web3, [("eth_call", [p, "pending"]) for p in params])
+                verdicts = _batch_verdicts(responses)
+            except Exception as e:
+                # After a transient failure only this chunk is simulated call by call
+                if is_unsupported(e):
+                    _batch_supported[0] = False
+        if verdicts is None:
+            verdicts = [_simulate_one(web3, p) for p in params]
+        for (key, _), verdict in zip(chunk, verdicts):
+            verdict_cache.set(key, verdict)
+            found[key] = verdict
+    return _verdicts(keys, found)
+
+
+def _simulate_one(web3, params):
+    try:
+        web3.eth.call(params, "pending")
+        return OK
+    except (ContractLogicError, ContractCustomError) as e:
+        return _exception_reason(e)
+
+
+async def async_simulate(web3, contract, sender, calls, block_number):
+    """Same as simulate, for an AsyncWeb3 client."""
+    verdict_cache.set_head(block_number)
+    keys = _keys(contract, sender, calls, block_number)
+    found = {key: verdict_cache.get(key) for key in keys}
+    missing = [(key, call) for key, call in zip(keys, calls) if found[key] is None]
+
+    for chunk in chunked(missing, BATCH_CHUNK_SIZE):
+        params = [_call_params(contract, sender, fn_name, args) for _, (fn_name, args) in chunk]
+        verdicts = None
+        if _batch_supported[0]:
+            try:
+                responses = await async_raw_batch_request(web3, [("eth_call", [p, "pending"]) for p in params])
+                verdicts = _batch_verdicts(responses)
+            except Exception as e:
+                if is_unsupported(e):
+                    _batch_supported[0] = False
+        if verdicts is None:
+            verdicts = await asyncio.gather(*(_async_simulate_one(web3, p) for p in params))
+        for (key, _), verdict in zip(chunk, verdicts):
+            verdict_cache.set(key, verdict)
+            found[key] = verdict
+    return _verdicts(keys, found)
+
+
+async def _async_simulate_one(web3, params):
+    try:
+        await web3.eth.call(params, "pending")
+        return OK
+    except (ContractLogicError, ContractCustomError) as e:
+        return _exception_reason(e)
@@ -1,8 +1,73 @@
 import reflex as rx
+import asyncio
 import json
-from .integration import create_proposal, list_proposals, vote, execute_proposal
+import logging
+from .async_integration import (
+    create_proposal,
+    list_proposals,
+    query_proposals,
+    vote,
+    execute_proposal,
+    bulk_vote,
+    bulk_execute,
+    voting_results,
+    get_proposal_detail,
+    prefetch_details,
+    search_proposals,
+    voting_power,
+    proposal_verdicts,
+    DETAIL_PREFETCH_ROWS,
+)
+from .nonce import nonce_manager
+from .receipts import receipt_tracker
+from .metrics import timed_handler
+from .queries import filter_proposals
 from .wallet_state import WalletState
 from typing import List, Dict, Any
+import time
+
+logger = logging.getLogger(__name__)
+
+# Fields that never change after a proposal is created, and the ones votes and
+# execution change. Only the second group is shipped again on updates.
+STATIC_FIELDS = ("id", "title", "endTime")
+STATUS_FIELDS = ("forVotes", "againstVotes", "executed")
+# Fields of a proposal_status entry: the chain ones, whether its voting period
+# ended, and whether a transaction from this session on it is not mined yet
+SHOWN_FIELDS = (*STATUS_FIELDS, "ended", "pending")
+
+# Filters of the proposal list and their query_proposals arguments.
+# "Mine" also filters on the connected wallet as proposer.
+PROPOSAL_FILTERS = {
+    "All": {},
+    "Active": {"status": "active"},
+    "Ending in 24h": {"status": "active", "ending_within": 24 * 3600},
+    "Executed": {"status": "executed"},
+    "Mine": {},
+}
+
+
+def tx_key(sender, nonce):
+    """Key of a transaction before its hash is known."""
+    return f"{sender.lower()}:{nonce}"
+
+
+def wallet_tx_dict(tx):
+    """Convert a built transaction to the format expected by eth_sendTransaction."""
+    tx_dict = {
+        "from": tx["from"],
+        "to": tx.get("to"),
+        "data": tx.get("data"),
+        "gas": hex(int(tx["gas"])),
+        "nonce": hex(tx["nonce"]),
+        "chainId": tx.get("chainId"),
+        "value": tx.get("value"),
+    }
+    # EIP-1559 fees when the node supports them, legacy gasPrice otherwise
+    for field in ("maxFeePerGas", "maxPriorityFeePerGas", "gasPrice"):
+        if tx.get(field) is not None:
+            tx_dict[field] = hex(int(tx[field]))
+    return tx_dict
 
 
 class ProposalState(rx.State):
@@ -13,33 +78,388 @@ class ProposalState(rx.State):
     proposals: List[Dict[str, Any]] = (
         list_proposals if isinstance(list_proposals, list) else []
     )
+    # Mutable fields of each proposal, keyed by id, with a version bumped on every change
+    proposal_status: Dict[str, Dict[str, Any]] = {}
+    results: List[Dict[str, Any]] = []
+    # Last id of the loaded pages; older proposals are below it. 0 once everything is loaded.
+    next_cursor: int = 0
+    # Full title and description of the expanded proposals only, keyed by id
+    details: Dict[str, Dict[str, Any]] = {}
+    # Proposals picked for a bulk vote or execution
+    selected: List[int] = []
+    proposal_filter: str = "All"
+    # query_proposals arguments of the current filter
+    _proposal_query: Dict[str, Any] = {}
+    search_query: str = ""
+    # Best matches of search_query, with title and snippet split into highlighted segments
+    search_results: List[Dict[str, Any]] = []
+    # Proposals created from this session whose transaction is not mined yet
+    pending_proposals: List[Dict[str, Any]] = []
+    # Status of each proposal as last read from the chain, without the optimistic changes
+    _chain_status: Dict[str, Dict[str, Any]] = {}
+    # Actions of the transactions sent from this session and not mined yet, by tx_key
+    _optimistic: Dict[str, Dict[str, Any]] = {}
+    # Why voting on or executing each loaded proposal would revert for the
+    # connected wallet ("" when it would not), keyed by id
+    verdicts: Dict[str, Dict[str, str]] = {}
+    # Wallet the verdicts were simulated for
+    _verdicts_address: str = ""
+    # Proposals whose voting period ended while shown, not executed yet
+    execute_suggestions: List[int] = []
 
     @rx.event(background=True)
+    @timed_handler
     async def send_transaction(self, tx_dict):
-        """Send a transaction to the blockchain."""
+        """
+        Send a transaction, or an ordered list of transactions, to the
+        blockchain. A list goes to the wallet as one EIP-5792 wallet_sendCalls
+        request, or one eth_sendTransaction per transaction when the wallet
+        does not support it. The hashes come back to transaction_sent.
+        """
+        txs = tx_dict if isinstance(tx_dict, list) else [tx_dict]
         return rx.call_script(f"""{{
             async function sendTransaction() {{
+                const txs = {json.dumps(txs)};
+                const sent = [];
                 try {{
-                    const tx = {json.dumps(tx_dict)};
-                    await window.ethereum.request({{
-                        method: 'eth_sendTransaction',
-                        params: [tx]
-                    }});
-                    window.location.reload();
+                    if (txs.length > 1) {{
+                        try {{
+                            const calls = await window.ethereum.request({{
+                                method: 'wallet_sendCalls',
+                                params: [{{
+                                    version: '2.0.0',
+                                    from: txs[0].from,
+                                    chainId: '0x' + Number(txs[0].chainId).toString(16),
+                                    atomicRequired: false,
+                                    calls: txs.map(tx => ({{to: tx.to, data: tx.data, value: '0x' + Number(tx.value || 0).toString(16)}}))
+                                }}]
+                            }});
+                            // The wallet only knows the hashes once the calls are included
+                            for (let attempt = 0; attempt < 120; attempt++) {{
+                                await new Promise(resolve => setTimeout(resolve, 1000));
+                                const status = await window.ethereum.request({{
+                                    method: 'wallet_getCallsStatus',
+                                    params: [calls.id]
+                                }});
+                                const receipts = status.receipts || [];
+                                if (receipts.length) {{
+                                    // One receipt per call, or a single one for an atomic batch
+                                    return {{sent: txs.map((tx, i) => ({{
+                                        from: tx.from,
+                                        nonce: tx.nonce,
+                                        hash: (receipts[i] || receipts[0]).transactionHash
+                                    }})), unsent: []}};
+                                }}
+                            }}
+                            return {{sent: txs.map(tx => ({{from: tx.from, nonce: tx.nonce, hash: null}})), unsent: []}};
+                        }} catch (err) {{
+                            // Only fall back when the wallet does not know the method
+                            if (![4200, -32601, -32602].includes(err.code)) throw err;
+                        }}
+                    }}
+                    for (const tx of txs) {{
+                        const hash = await window.ethereum.request({{
+                            method: 'eth_sendTransaction',
+                            params: [tx]
+                        }});
+                        sent.push({{from: tx.from, nonce: tx.nonce, hash: hash}});
+                    }}
                 }} catch (err) {{
                     console.error(err);
                     alert('Transaction failed: ' + (err.message || err));
+                    const unsent = txs.slice(sent.length).map(tx => ({{from: tx.from, nonce: tx.nonce}}));
+                    return {{sent: sent, unsent: unsent}};
                 }}
+                return {{sent: sent, unsent: []}};
             }}
             sendTransaction();
-        }}""")
+        }}""", callback=ProposalState.transaction_sent)
 
     @rx.event
+    @timed_handler
+    def transaction_sent(self, result: Dict[str, Any]):
+        """
+        Track the receipts of the transactions the wallet sent, and roll back
+        the ones it did not send, giving their nonces back to the nonce manager.
+        """
+        result = result or {}
+        unsent = result.get("unsent", [])
+        # Highest nonce first, so each release extends the free range downwards
+        for tx in sorted(unsent, key=lambda tx: int(tx["nonce"], 16), reverse=True):
+            nonce_manager.release(tx["from"], int(tx["nonce"], 16))
+
+        dropped = [tx_key(tx["from"], int(tx["nonce"], 16)) for tx in unsent]
+        optimistic = dict(self._optimistic)
+        for tx in result.get("sent", []):
+            key = tx_key(tx["from"], int(tx["nonce"], 16))
+            if not tx.get("hash"):
+                # The wallet never reported a hash: nothing to wait for
+                dropped.append(key)
+                continue
+            tx_hash = tx["hash"].lower()
+            receipt_tracker.track(tx_hash, self.router.session.client_token)
+            if key in optimistic:
+                optimistic[key] = {**optimistic[key], "hash": tx_hash}
+        self._optimistic = optimistic
+        self._drop_optimistic(dropped)
+
+    def _add_optimistic(self, txs: List[Dict[str, Any]], actions: List[Dict[str, Any]]):
+        """Show the effect of each transaction right away, until its receipt arrives."""
+        added = {tx_key(tx["from"], tx["nonce"]): {**action, "hash": None} for tx, action in zip(txs, actions)}
+        self._optimistic = {**self._optimistic, **added}
+        created = [{"key": key, "title": a["title"]} for key, a in added.items() if a["type"] == "create"]
+        if created:
+            self.pending_proposals = created + self.pending_proposals
+        self._refresh_status({str(a["id"]) for a in added.values() if "id" in a})
+
+    def _drop_optimistic(self, keys: List[str]):
+        """Remove optimistic actions, showing the chain values again."""
+        dropped = [self._optimistic[key] for key in keys if key in self._optimistic]
+        if not dropped:
+            return
+        self._optimistic = {k: a for k, a in self._optimistic.items() if k not in keys}
+        if any(a["type"] == "create" for a in dropped):
+            self.pending_proposals = [p for p in self.pending_proposals if p["key"] not in keys]
+        self._refresh_status({str(a["id"]) for a in dropped if "id" in a})
+
+    def _settle_transactions(self, settled: Dict[str, bool]):
+        """
+        Drop the optimistic actions of mined transactions: the chain values
+        include them when they succeeded, and they are rolled back otherwise.
+        """
+        if not settled:
+            return
+        mined = [a for a in self._optimistic.values() if a["hash"] in settled]
+        self._drop_optimistic([k for k, a in self._optimistic.items() if a["hash"] in settled])
+        # What the succeeded ones changed for the next simulation, without asking the node
+        verdicts = {}
+        for action in mined:
+            key = str(action.get("id"))
+            if not settled[action["hash"]] or key not in self.verdicts:
+                continue
+            entry = verdicts.get(key, self.verdicts[key])
+            if action["type"] == "vote":
+                verdicts[key] = {**entry, "vote": "Already voted"}
+            elif action["type"] == "execute":
+                verdicts[key] = {**entry, "vote": "Proposal already executed"}
+        if verdicts:
+            self.verdicts = {**self.verdicts, **verdicts}
+
+    async def _wallet_address(self):
+        """Address of the connected wallet, or None. Call inside `async with self`."""
+        wallet_state = await self.get_state(WalletState)
+        return wallet_state.address if wallet_state.is_connected else None
+
+    async def _update_verdicts(self, proposal_ids: List[int], address):
+        """Simulate voting on and executing `proposal_ids` from `address`, in one request."""
+        if not address or not proposal_ids:
+            return
+        try:
+            verdicts = await proposal_verdicts(proposal_ids, address)
+        except Exception as e:
+            logger.warning("Failed to simulate the proposal actions: %s", e)
+            return
+        async with self:
+            if address != await self._wallet_address():
+                # The wallet changed meanwhile
+                return
+            if address != self._verdicts_address:
+                # Verdicts of another wallet no longer apply
+                self._verdicts_address = address
+                self.verdicts = verdicts
+            else:
+                self.verdicts = {**self.verdicts, **verdicts}
+
+    @rx.event(background=True)
+    @timed_handler
+    async def refresh_verdicts(self):
+        """Simulate the loaded proposals again for the wallet that just connected, or clear them."""
+        async with self:
+            address = await self._wallet_address()
+            ids = [p["id"] for p in self.proposals]
+            if address != self._verdicts_address:
+                # Do not show the verdicts of the previous wallet meanwhile
+                self._verdicts_address = ""
+                self.verdicts = {}
+            if not address:
+                return
+        await self._update_verdicts(ids, address)
+
+    def _status_entry(self, key: str) -> Dict[str, Any]:
+        """Status shown for a proposal: its chain values plus the pending optimistic actions."""
+        entry = {**self._chain_status[key], "pending": False}
+        for action in self._optimistic.values():
+            if str(action.get("id")) != key:
+                continue
+            entry["pending"] = True
+            if action["type"] == "vote":
+                field = "forVotes" if action["support"] else "againstVotes"
+                entry[field] += action["weight"]
+            elif action["type"] == "execute":
+                entry["executed"] = True
+        return entry
+
+    def _refresh_status(self, keys):
+        """Reassign proposal_status with the entries of `keys` whose shown status changed."""
+        status = {}
+        for key in keys:
+            if key not in self._chain_status:
+                continue
+            current = self.proposal_status.get(key)
+            entry = self._status_entry(key)
+            if current is None or any(current[field] != entry[field] for field in SHOWN_FIELDS):
+                entry["version"] = current["version"] + 1 if current else 0
+                status[key] = entry
+        if status:
+            self.proposal_status = {**self.proposal_status, **status}
+        executed = [i for i in self.execute_suggestions if self.proposal_status.get(str(i), {}).get("executed")]
+        if executed:
+            self.execute_suggestions = [i for i in self.execute_suggestions if i not in executed]
+
+    def _expire_proposals(self, proposal_ids: List[int], suggest_execute: bool):
+        """
+        Show the voting period of `proposal_ids` as ended, and suggest executing
+        the ones not executed yet when `suggest_execute` is set.
+        """
+        chain = {
+            str(i): {**self._chain_status[str(i)], "ended": True}
+            for i in proposal_ids
+            if str(i) in self._chain_status and not self._chain_status[str(i)]["ended"]
+        }
+        if not chain:
+            return
+        self._chain_status = {**self._chain_status, **chain}
+        self._refresh_status(chain)
+        if suggest_execute:
+            suggested = [
+                int(key) for key in chain
+                if not self.proposal_status[key]["executed"] and int(key) not in self.execute_suggestions
+            ]
+            if suggested:
+                self.execute_suggestions = self.execute_suggestions + suggested
+
+    @timed_handler
+    def dismiss_suggestion(self, proposal_id: int):
+        """Hide the execute suggestion of a proposal."""
+        self.execute_suggestions = [i for i in self.execute_suggestions if i != proposal_id]
+
+    @rx.event(background=True)
+    @timed_handler
     async def get_proposals(self):
-        """Update proposals list."""
-        self.proposals = list_proposals()
+        """Update the newest page of proposals matching the current filter."""
+        async with self:
+            query = dict(self._proposal_query)
+            address = await self._wallet_address()
+        proposals, cursor = await query_proposals(**query)
+        results = await voting_results(proposals)
+        async with self:
+            if query != self._proposal_query:
+                # The filter changed meanwhile
+                return
+            if not self.proposals:
+                self.next_cursor = cursor or 0
+            self._apply_proposal_updates(proposals, results)
+        # Warm the detail cache for the rows shown first
+        await asyncio.gather(
+            prefetch_details([p["id"] for p in proposals[:DETAIL_PREFETCH_ROWS]]),
+            self._update_verdicts([p["id"] for p in proposals], address),
+        )
+
+    @rx.event(background=True)
+    @timed_handler
+    async def load_more_proposals(self):
+        """Append the next page of older proposals."""
+        async with self:
+            cursor = self.next_cursor
+            query = dict(self._proposal_query)
+            address = await self._wallet_address()
+        if not cursor:
+            return
+
+        proposals, next_cursor = await query_proposals(**query, cursor=cursor)
+        results = await voting_results(proposals)
+        async with self:
+            if self.next_cursor != cursor or query != self._proposal_query:
+                # Another load already appended this page, or the filter changed
+                return
+            self.next_cursor = next_cursor or 0
+            self._apply_proposal_updates(proposals, results)
+        await self._update_verdicts([p["id"] for p in proposals], address)
+
+    @rx.event(background=True)
+    @timed_handler
+    async def set_proposal_filter(self, proposal_filter: str):
+        """Show only the proposals matching one of PROPOSAL_FILTERS."""
+        async with self:
+            query = dict(PROPOSAL_FILTERS.get(proposal_filter, {}))
+            if proposal_filter == "Mine":
+                wallet_state = await self.get_state(WalletState)
+                if not wallet_state.is_connected:
+                    return rx.window_alert("Please connect your wallet!")
+                query["proposer"] = wallet_state.address
+
+            self.proposal_filter = proposal_filter
+            self._proposal_query = query
+            self.proposals = []
+            self.proposal_status = {}
+            self._chain_status = {}
+            self.results = []
+            # Suggestions refer to the proposals of the previous filter
+            self.execute_suggestions = []
+            self.next_cursor = 0
+        return ProposalState.get_proposals
+
+    @rx.event(background=True)
+    @timed_handler
+    async def search(self, text: str):
+        """Search proposal titles and descriptions."""
+        async with self:
+            self.search_query = text
+        try:
+            results = await search_proposals(text)
+        except Exception as e:
+            logger.warning("Search failed: %s", e)
+            results = []
+        async with self:
+            if self.search_query != text:
+                # A newer search was started meanwhile
+                return
+            self.search_results = results
+
+    @rx.event(background=True)
+    @timed_handler
+    async def toggle_details(self, proposal_id: int):
+        """Expand a proposal with its full title and description, or collapse it."""
+        key = str(proposal_id)
+        async with self:
+            if key in self.details:
+                self.details = {k: v for k, v in self.details.items() if k != key}
+                return
+
+        try:
+            detail = await get_proposal_detail(proposal_id)
+        except Exception as e:
+            return rx.window_alert(f"Error loading proposal: {str(e)}")
+
+        async with self:
+            self.details = {**self.details, key: detail}
 
     @rx.event(background=True)
+    @timed_handler
+    async def prefetch_row_details(self, proposal_id: int):
+        """Load the details of a row the user is about to reach, and of the rows after it."""
+        async with self:
+            ids = [p["id"] for p in self.proposals]
+        if proposal_id in ids:
+            # The list is newest first, and filtered: the next rows are the next entries
+            start = ids.index(proposal_id)
+            rows = ids[start:start + DETAIL_PREFETCH_ROWS]
+        else:
+            rows = range(proposal_id, max(0, proposal_id - DETAIL_PREFETCH_ROWS), -1)
+        await prefetch_details(rows)
+
+    @rx.event(background=True)
+    @timed_handler
     async def create_new_proposal(self):
         """Create a new proposal."""
 
@@ -52,32 +472,22 @@ class ProposalState(rx.State):
             if not wallet_state.is_connected:
                 return rx.window_alert("Please connect your wallet!")
 
+            title = self.title
+            description = self.description
+            voting_period = self.voting_period
+            address = wallet_state.address
+
         try:
-            async with self:
-                tx = create_proposal(
-                    self.title,
-                    self.description,
-                    self.voting_period,
-                    wallet_state.address,
-                )
+            # RPC calls run outside the state lock so other events are not blocked
+            tx = await create_proposal(title, description, voting_period, address)
 
-                # Converta a transação para um dicionário primeiro
-                tx_dict = {
-                    "from": tx["from"],
-                    "to": tx.get("to"),
-                    "data": tx.get("data"),
-                    "gas": hex(int(tx["gas"])),
-                    "gasPrice": hex(int(tx["gasPrice"])),
-                    "nonce": hex(tx["nonce"]),
-                    "chainId": tx.get("chainId"),
-                    "value": tx.get("value"),
-                }
+            # Converta a transação para um dicionário primeiro
+            tx_dict = wallet_tx_dict(tx)
 
+            async with self:
                 # Reset form
                 self.show_form = False
-
-                # Convert proposals to plain dictionaries before setting state
-                self.proposals = list_proposals()
+                self._add_optimistic([tx], [{"type": "create", "title": title}])
 
             # Send transaction
             return ProposalState.send_transaction(tx_dict)
@@ -86,6 +496,7 @@ class ProposalState(rx.State):
             return rx.window_alert(f"Error creating proposal: {str(e)}")
 
     @rx.event(background=True)
+    @timed_handler
     async def vote_on_proposal(self, proposal_id: int, support: bool):
         """Handle voting through state management."""
 
@@ -95,21 +506,18 @@ class ProposalState(rx.State):
             if not wallet_state.is_connected:
                 return rx.window_alert("Please connect your wallet!")
 
+            address = wallet_state.address
+
         try:
+            tx, weight = await asyncio.gather(vote(proposal_id, support, address), voting_power(address))
+
+            # Converta a transação para um dicionário primeiro
+            tx_dict = wallet_tx_dict(tx)
+
             async with self:
-                tx = vote(proposal_id, support, wallet_state.address)
-
-                # Converta a transação para um dicionário primeiro
-                tx_dict = {
-                    "from": tx["from"],
-                    "to": tx.get("to"),
-                    "data": tx.get("data"),
-                    "gas": hex(int(tx["gas"])),
-                    "gasPrice": hex(int(tx["gasPrice"])),
-                    "nonce": hex(tx["nonce"]),
-                    "chainId": tx.get("chainId"),
-                    "value": tx.get("value"),
-                }
+                self._add_optimistic(
+                    [tx], [{"type": "vote", "id": proposal_id, "support": support, "weight": weight}]
+                )
 
             # Send transaction
             return ProposalState.send_transaction(tx_dict)
@@ -117,6 +525,7 @@ class ProposalState(rx.State):
             return rx.window_alert(f"Error voting: {str(e)}")
 
     @rx.event(background=True)
+    @timed_handler
     async def execute_proposal(self, proposal_id: int):
         """Execute proposal with wallet check."""
         async with self:
@@ -125,28 +534,128 @@ class ProposalState(rx.State):
             if not wallet_state.is_connected:
                 return rx.window_alert("Please connect your wallet!")
 
+            address = wallet_state.address
+
         try:
+            tx = await execute_proposal(proposal_id, address)
+
+            # Converta a transação para um dicionário primeiro
+            tx_dict = wallet_tx_dict(tx)
+
             async with self:
-                tx = execute_proposal(proposal_id, wallet_state.address)
-
-                # Converta a transação para um dicionário primeiro
-                tx_dict = {
-                    "from": tx["from"],
-                    "to": tx.get("to"),
-                    "data": tx.get("data"),
-                    "gas": hex(int(tx["gas"])),
-                    "gasPrice": hex(int(tx["gasPrice"])),
-                    "nonce": hex(tx["nonce"]),
-                    "chainId": tx.get("chainId"),
-                    "value": tx.get("value"),
-                }
-
-                self.proposals = list_proposals()
+                self._add_optimistic([tx], [{"type": "execute", "id": proposal_id}])
 
             # Send transaction
             return ProposalState.send_transaction(tx_dict)
         except Exception as e:
             return rx.window_alert(f"Error executing proposal: {str(e)}")
 
+    @timed_handler
+    def select_proposal(self, proposal_id: int, checked: bool):
+        """Add or remove a proposal from the bulk selection."""
+        if checked and proposal_id not in self.selected:
+            self.selected = self.selected + [proposal_id]
+        elif not checked:
+            self.selected = [i for i in self.selected if i != proposal_id]
+
+    @rx.event(background=True)
+    @timed_handler
+    async def bulk_vote_on_proposals(self, support: bool):
+        """Vote on every selected proposal in a single wallet interaction."""
+        async with self:
+            wallet_state = await self.get_state(WalletState)
+
+            if not wallet_state.is_connected:
+                return rx.window_alert("Please connect your wallet!")
+
+            address = wallet_state.address
+            proposal_ids = list(self.selected)
+            if not proposal_ids:
+                return
+
+        try:
+            txs, weight = await asyncio.gather(
+                bulk_vote([(i, support) for i in proposal_ids], address), voting_power(address)
+            )
+
+            async with self:
+                self.selected = []
+                self._add_optimistic(
+                    txs,
+                    [{"type": "vote", "id": i, "support": support, "weight": weight} for i in proposal_ids],
+                )
+
+            return ProposalState.send_transaction([wallet_tx_dict(tx) for tx in txs])
+        except Exception as e:
+            return rx.window_alert(f"Error voting: {str(e)}")
+
+    @rx.event(background=True)
+    @timed_handler
+    async def bulk_execute_proposals(self):
+        """Execute every selected proposal in a single wallet interaction."""
+        async with self:
+            wallet_state = await self.get_state(WalletState)
+
+            if not wallet_state.is_connected:
+                return rx.window_alert("Please connect your wallet!")
+
+            address = wallet_state.address
+            proposal_ids = list(self.selected)
+            if not proposal_ids:
+                return
+
+        try:
+            txs = await bulk_execute(proposal_ids, address)
+
+            async with self:
+                self.selected = []
+                self._add_optimistic(txs, [{"type": "execute", "id": i} for i in proposal_ids])
+
+            return ProposalState.send_transaction([wallet_tx_dict(tx) for tx in txs])
+        except Exception as e:
+            return rx.window_alert(f"Error executing proposals: {str(e)}")
+
+    def _apply_proposal_updates(
+        self, updates: List[Dict[str, Any]], results: List[Dict[str, Any]]
+    ):
+        """
+        Merge fresh proposal entries and results, newest first. A var is only
+        reassigned, and so sent to the client, when one of its entries actually
+        changed. Proposals older than the loaded pages are left for load_more_proposals.
+        """
+        now = int(time.time())
+        if self.next_cursor:
+            updates = [p for p in updates if p["id"] >= self.next_cursor]
+        if self._proposal_query:
+            # New proposals must match the filter; the shown ones are kept up to date
+            shown = {p["id"] for p in self.proposals}
+            matching = {
+                p["id"] for p in filter_proposals(updates, now, **self._proposal_query, limit=len(updates))
+            }
+            updates = [p for p in updates if p["id"] in shown or p["id"] in matching]
+        ids = {p["id"] for p in updates}
+        results = [r for r in results if r["id"] in ids]
+
+        chain = {}
+        for p in updates:
+            key = str(p["id"])
+            # Once ended, even if the scheduler clock ran slightly ahead of this one
+            ended = p["endTime"] <= now or self._chain_status.get(key, {}).get("ended", False)
+            chain[key] = {**{field: p[field] for field in STATUS_FIELDS}, "ended": ended}
+        if any(self._chain_status.get(key) != entry for key, entry in chain.items()):
+            self._chain_status = {**self._chain_status, **chain}
+        self._refresh_status(chain)
+
+        known = {p["id"] for p in self.proposals}
+        new = [{field: p[field] for field in STATIC_FIELDS} for p in updates if p["id"] not in known]
+        if new:
+            self.proposals = sorted(self.proposals + new, key=lambda p: p["id"], reverse=True)
+
+        changed = {r["id"]: r for r in results}
+        merged = [changed.pop(r["id"], r) for r in self.results]
+        if merged != self.results or changed:
+            self.results = sorted(merged + list(changed.values()), key=lambda r: r["id"], reverse=True)
+
+    @timed_handler
     def toggle_form(self):
         self.show_form = not self.show_form
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import AsyncHTTPProvider, HTTPProvider
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Settings
+# Comma separated list of RPC endpoints; RPC_URL is used when it is not set
+RPC_URLS = [url.strip() for url in os.getenv("RPC_URLS", "").split(",") if url.strip()]
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+# A read is duplicated on the next endpoint once it takes longer than this
+# percentile of the primary endpoint's recent latencies
+RPC_HEDGE_PERCENTILE = int(os.getenv("RPC_HEDGE_PERCENTILE", "95"))
+RPC_HEDGE_DEFAULT_DELAY = float(os.getenv("RPC_HEDGE_DEFAULT_DELAY", "0.5"))
+RPC_HEDGE_MIN_DELAY = float(os.getenv("RPC_HEDGE_MIN_DELAY", "0.05"))
+RPC_BREAKER_FAILURES = int(os.getenv("RPC_BREAKER_FAILURES", "3"))
+RPC_BREAKER_COOLDOWN = float(os.getenv("RPC_BREAKER_COOLDOWN", "30"))
+
+# Reads that are safe to send to two endpoints at once
+HEDGEABLE_METHODS = {
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_estimateGas",
+    "eth_feeHistory",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getBlockByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getTransactionCount",
+    "eth_getTransactionReceipt",
+}
+
+# Samples needed before the latency percentile is trusted
+MIN_LATENCY_SAMPLES = 20
+
+
+class Endpoint:
+    """Latency statistics and circuit breaker of one RPC endpoint."""
+
+    def __init__(self, name, provider):
+        self.name = name
+        self.provider = provider
+        self.latencies = deque(maxlen=200)
+        self.ewma = None
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        """False while the breaker is open; half-open again after the cooldown."""
+        return self.opened_at is None or time.monotonic() - self.opened_at >= RPC_BREAKER_COOLDOWN
+
+    def record_latency(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+            self.ewma = latency if self.ewma is None else 0.8 * self.ewma + 0.2 * latency
+
+    def record_success(self, latency):
+        self.record_latency(latency)
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= RPC_BREAKER_FAILURES:
+                self.opened_at = time.monotonic()
+
+    def hedge_delay(self):
+        with self._lock:
+            latencies = list(self.latencies)
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return RPC_HEDGE_DEFAULT_DELAY
+        delay = statistics.quantiles(latencies, n=100)[RPC_HEDGE_PERCENTILE - 1]
+        return max(delay, RPC_HEDGE_MIN_DELAY)
+
+
+class EndpointPool:
+    """Orders endpoints by health and latency."""
+
+    def __init__(self, endpoints):
+        self.endpoints = endpoints
+        self.hedged = 0
+        self.failovers = 0
+
+    def ranked(self):
+        """Available endpoints, fastest first. Endpoints without samples go first to get measured."""
+        available = [e for e in self.endpoints if e.is_available()]
+        if not available:
+            # Everything is down: try the endpoint that failed longest ago
+            return sorted(self.endpoints, key=lambda e: e.opened_at)
+        return sorted(available, key=lambda e: e.ewma or 0.0)
+
+
+def pooled_session():
+    """requests session keeping up to RPC_POOL_SIZE connections alive per endpoint."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=RPC_POOL_SIZE, pool_maxsize=RPC_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class MultiEndpointProvider(JSONBaseProvider):
+    """
+    Provider over several endpoints (URLs or provider instances) with
+    latency-aware routing, hedged reads, failover and circuit breakers.
+    """
+
+    def __init__(self, endpoints, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = EndpointPool([
+            Endpoint(e, HTTPProvider(e, session=pooled_session())) if isinstance(e, str)
+            else Endpoint(type(e).__name__, e)
+            for e in endpoints
+        ])
+        self._executor = ThreadPoolExecutor(max_workers=RPC_POOL_SIZE)
+
+    def _call(self, endpoint, method, params):
+        start = time.monotonic()
+        try:
+            response = endpoint.provider.make_request(method, params)
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.monotonic() - start)
+        return response
+
+    def _hedged(self, endpoints, method, params):
+        backups = list(endpoints[1:])
+        pending = {self._executor.submit(self._call, endpoints[0], method, params)}
+        delay = endpoints[0].hedge_delay()
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=delay if backups else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+            if backups:
+                # Slow or failed: send the same read to the next endpoint
+                self.pool.hedged += 1
+                pending.add(self._executor.submit(self._call, backups.pop(0), method, params))
+        raise error
+
+    def make_request(self, method, params):
+        endpoints = self.pool.ranked()
+        if method in HEDGEABLE_METHODS and len(endpoints) > 1:
+            return self._hedged(endpoints, method, params)
+
+        error = None
+        for endpoint in endpoints:
+            try:
+                return self._call(endpoint, method, params)
+            except Exception as e:
+                self.pool.failovers += 1
+                error = e
+        raise error
+
+    def make_batch_request(self, batch_requests):
+        error = None
+        for endpoint in self.pool.ranked():
+            start = time.monotonic()
+            try:
+                response = endpoint.provider.make_batch_request(batch_requests)
+            except Exception as e:
+                endpoint.record_failure()
+                self.pool.failovers += 1
+                error = e
+                continue
+            endpoint.record_success(time.monotonic() - start)
+            return response
+        raise error
+
+    def is_connected(self, show_traceback=False):
+        return any(e.provider.is_connected() for e in self.pool.endpoints)
+
+
+class AsyncMultiEndpointProvider(AsyncJSONBaseProvider):
+    """Same as MultiEndpointProvider, for AsyncWeb3."""
+
+    def __init__(self, endpoints, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = EndpointPool([
+            Endpoint(e, AsyncHTTPProvider(e)) if isinstance(e, str)
+            else Endpoint(type(e).__name__, e)
+            for e in endpoints
+        ])
+
+    async def cache_async_session(self, session):
+        """Share one pooled aiohttp session between every HTTP endpoint."""
+        for endpoint in self.pool.endpoints:
+            if isinstance(endpoint.provider, AsyncHTTPProvider):
+                await endpoint.provider.cache_async_session(session)
+        return session
+
+    async def _call(self, endpoint, method, params):
+        start = time.monotonic()
+        try:
+            response = await endpoint.provider.make_request(method, params)
+        except asyncio.CancelledError:
+            # Lost a hedge race: at least this slow, so it ranks lower next time
+            endpoint.record_latency(time.monotonic() - start)
+            raise
+        except Exception:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.monotonic() - start)
+        return response
+
+    async def _hedged(self, endpoints, method, params):
+        backups = list(endpoints[1:])
+        pending = {asyncio.ensure_future(self._call(endpoints[0], method, params))}
+        delay = endpoints[0].hedge_delay()
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay if backups else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        error = e
+                if backups:
+                    self.pool.hedged += 1
+                    pending.add(asyncio.ensure_future(self._call(backups.pop(0), method, params)))
+            raise error
+        finally:
+            # The losing request is not needed anymore
+            for task in pending:
+                task.cancel()
+
+    async def make_request(self, method, params):
+        endpoints = self.pool.ranked()
+        if method in HEDGEABLE_METHODS and len(endpoints) > 1:
+            return await self._hedged(endpoints, method, params)
+
+        error = None
+        for endpoint in endpoints:
+            try:
+                return await self._call(endpoint, method, params)
+            except Exception as e:
+                self.pool.failovers += 1
+                error = e
+        raise error
+
+    async def make_batch_request(self, batch_requests):
+        error = None
+        for endpoint in self.pool.ranked():
+            start = time.monotonic()
+            try:
+                response = await endpoint.provider.make_batch_request(batch_requests)
+            except Exception as e:
+                endpoint.record_failure()
+                self.pool.failovers += 1
+                error = e
+                continue
+            endpoint.record_success(time.monotonic() - start)
+            return response
+        raise error
+
+    async def is_connected(self, show_traceback=False):
+        for endpoint in self.pool.endpoints:
+            if await endpoint.provider.is_connected():
+                return True
+        return False
+
+
+def make_provider(rpc_url):
+    """Provider for integration.py: every RPC_URLS endpoint, or just `rpc_url`."""
+    urls = RPC_URLS or [rpc_url]
+    if len(urls) == 1:
+        return HTTPProvider(urls[0], session=pooled_session())
+    return MultiEndpointProvider(urls)
+
+
+def make_async_provider(rpc_url):
+    """Same as make_provider, for async_integration.py."""
+    urls = RPC_URLS or [rpc_url]
+    if len(urls) == 1:
+        return AsyncHTTPProvider(urls[0])
+    return AsyncMultiEndpointProvider(urls)
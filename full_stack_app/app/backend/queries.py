@@ -0,0 +1,82 @@
+from web3 import Web3
+
+# status filter -> SQL condition and the same test on a proposal dict, given `now`
+STATUSES = {
+    "active": ("executed = 0 AND end_time > :now", lambda p, now: not p["executed"] and p["endTime"] > now),
+    "ended": ("executed = 0 AND end_time <= :now", lambda p, now: not p["executed"] and p["endTime"] <= now),
+    "executed": ("executed = 1", lambda p, now: p["executed"]),
+}
+# sort -> ORDER BY clause and the same order on proposal dicts
+SORTS = {
+    "newest": ("id DESC", lambda p: -p["id"]),
+    "oldest": ("id ASC", lambda p: p["id"]),
+    "ending_soon": ("end_time ASC, id ASC", lambda p: (p["endTime"], p["id"])),
+}
+
+SUMMARY_COLUMNS = "id, title, end_time, for_votes, against_votes, executed, proposer"
+
+
+def _check(status, sort):
+    if status is not None and status not in STATUSES:
+        raise ValueError(f"Unknown proposal status: {status}")
+    if sort not in SORTS:
+        raise ValueError(f"Unknown proposal sort: {sort}")
+
+
+def build_query(now, status=None, ending_within=None, proposer=None, sort="newest", cursor=None, limit=20):
+    """
+    SQL and parameters selecting proposal summaries. `cursor` is the last id
+    of the previous page and only applies to the id sorts.
+    """
+    _check(status, sort)
+    conditions = []
+    params = {"now": now, "limit": limit}
+    if status is not None:
+        conditions.append(STATUSES[status][0])
+    if ending_within is not None:
+        conditions.append("end_time > :now AND end_time <= :deadline")
+        params["deadline"] = now + ending_within
+    if proposer is not None:
+        conditions.append("proposer = :proposer")
+        params["proposer"] = Web3.to_checksum_address(proposer)
+    if cursor is not None and sort == "newest":
+        conditions.append("id < :cursor")
+        params["cursor"] = cursor
+    elif cursor is not None and sort == "oldest":
+        conditions.append("id > :cursor")
+        params["cursor"] = cursor
+
+    query = f"SELECT {SUMMARY_COLUMNS} FROM proposals"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {SORTS[sort][0]} LIMIT :limit"
+    return query, params
+
+
+def filter_proposals(proposals, now, status=None, ending_within=None, proposer=None, sort="newest", cursor=None, limit=20):
+    """Same selection as build_query, over a list of proposal dicts."""
+    _check(status, sort)
+    if proposer is not None:
+        proposer = Web3.to_checksum_address(proposer)
+
+    def matches(p):
+        if status is not None and not STATUSES[status][1](p, now):
+            return False
+        if ending_within is not None and not now < p["endTime"] <= now + ending_within:
+            return False
+        if proposer is not None and p["proposer"] != proposer:
+            return False
+        if cursor is not None and sort == "newest" and p["id"] >= cursor:
+            return False
+        if cursor is not None and sort == "oldest" and p["id"] <= cursor:
+            return False
+        return True
+
+    return sorted(filter(matches, proposals), key=SORTS[sort][1])[:limit]
+
+
+def next_query_cursor(page, sort, limit):
+    """Cursor of the page after `page`, or None when there is none (or the sort has no cursor)."""
+    if len(page) < limit or sort not in ("newest", "oldest"):
+        return None
+    return page[-1]["id"]
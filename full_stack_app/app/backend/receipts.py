@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from .async_integration import limited
+from .batch import async_raw_batch_request, is_unsupported
+
+load_dotenv()
+
+# Settings
+# A transaction without a receipt is polled again after 1, 2, 4... blocks, up to this many
+RECEIPT_MAX_BACKOFF_BLOCKS = int(os.getenv("RECEIPT_MAX_BACKOFF_BLOCKS", "8"))
+# Seconds before a transaction that never got mined is considered dropped
+RECEIPT_TIMEOUT = float(os.getenv("RECEIPT_TIMEOUT", "900"))
+
+
+def _succeeded(receipt):
+    # Raw batch responses keep the status as a hex string
+    status = receipt["status"]
+    return (int(status, 16) if isinstance(status, str) else int(status)) == 1
+
+
+class ReceiptTracker:
+    """
+    Transactions sent from the connected sessions that are still waiting for
+    their receipt. The subscriber checks them once per new block.
+    """
+
+    def __init__(self):
+        # tx hash -> {"token", "since", "next_block", "backoff"}
+        self.pending = {}
+        self._batch_supported = True
+
+    def track(self, tx_hash, token):
+        """Settle `tx_hash` in the session of `token` once it is mined."""
+        self.pending[tx_hash.lower()] = {
+            "token": token,
+            "since": time.monotonic(),
+            "next_block": 0,
+            "backoff": 1,
+        }
+
+    async def fetch(self, web3, hashes):
+        """Receipts of `hashes` (None when not mined yet), in one JSON-RPC batch when the node supports it."""
+        if self._batch_supported:
+            try:
+                # Raw responses: web3.batch_requests() fails the whole batch on a missing receipt
+                responses = await limited(async_raw_batch_request(
+                    web3, [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes]
+                ))
+                return [response.get("result") for response in responses]
+            except Exception as e:
+                # After a transient failure only this round is polled one by one
+                if is_unsupported(e):
+                    self._batch_supported = False
+        return await asyncio.gather(*(
+            limited(web3.manager.coro_request("eth_getTransactionReceipt", [tx_hash]))
+            for tx_hash in hashes
+        ))
+
+    def restore(self, settled):
+        """Track again the transactions of a check() result that could not be delivered."""
+        for token, hashes in settled.items():
+            for tx_hash in hashes:
+                self.track(tx_hash, token)
+
+    async def check(self, web3, head, logs=()):
+        """
+        Settle the tracked transactions mined up to `head`, as
+        {session token: {tx hash: succeeded}}. A hash found in the DAO `logs`
+        of the new blocks succeeded without asking the node; the others are
+        polled together, each one after its backoff.
+        """
+        settled = {}
+
+        def settle(tx_hash, succeeded):
+            entry = self.pending.pop(tx_hash)
+            settled.setdefault(entry["token"], {})[tx_hash] = succeeded
+
+        for log in logs:
+            tx_hash = log["transactionHash"].to_0x_hex()
+            if tx_hash in self.pending:
+                settle(tx_hash, True)
+
+        due = [tx_hash for tx_hash, entry in self.pending.items() if entry["next_block"] <= head]
+        if not due:
+            return settled
+        try:
+            receipts = await self.fetch(web3, due)
+        except Exception:
+            self.restore(settled)
+            raise
+        now = time.monotonic()
+        for tx_hash, receipt in zip(due, receipts):
+            entry = self.pending[tx_hash]
+            if receipt is not None:
+                settle(tx_hash, _succeeded(receipt))
+            elif now - entry["since"] > RECEIPT_TIMEOUT:
+                settle(tx_hash, False)
+            else:
+                entry["next_block"] = head + entry["backoff"]
+                entry["backoff"] = min(entry["backoff"] * 2, RECEIPT_MAX_BACKOFF_BLOCKS)
+        return settled
+
+
+receipt_tracker = ReceiptTracker()
@@ -0,0 +1,110 @@
+import re
+
+# External-content FTS5 index over the proposals table, kept in sync by triggers
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS proposals_fts USING fts5(
+    title,
+    description,
+    content='proposals',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS proposals_fts_insert AFTER INSERT ON proposals BEGIN
+    INSERT INTO proposals_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS proposals_fts_delete AFTER DELETE ON proposals BEGIN
+    INSERT INTO proposals_fts (proposals_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS proposals_fts_update AFTER UPDATE OF title, description ON proposals BEGIN
+    INSERT INTO proposals_fts (proposals_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO proposals_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+"""
+
+# Matches are wrapped in these by FTS5 and split into segments afterwards, so
+# on-chain text never reaches the page as HTML
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+SNIPPET_TOKENS = 16
+# A title match counts this many times more than a description match
+TITLE_WEIGHT = 5.0
+
+
+def backfill(conn):
+    """Build the search index of an index created before it existed, and set its ranking."""
+    with conn:
+        conn.execute(
+            "INSERT INTO proposals_fts (proposals_fts, rank) VALUES ('rank', ?)",
+            (f"bm25({TITLE_WEIGHT}, 1.0)",),
+        )
+        if conn.execute("SELECT 1 FROM proposals_fts_docsize LIMIT 1").fetchone():
+            return
+        if conn.execute("SELECT 1 FROM proposals LIMIT 1").fetchone():
+            conn.execute("INSERT INTO proposals_fts (proposals_fts) VALUES ('rebuild')")
+
+
+def match_query(text):
+    """
+    FTS5 query for what the user typed: every word must match, the last one
+    as a prefix. None when there is nothing to search for.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+def segments(text):
+    """Split FTS5 highlighted text into [{"text", "match"}] parts."""
+    parts = []
+    for i, part in enumerate(re.split(f"[{MATCH_START}{MATCH_END}]", text or "")):
+        if part:
+            parts.append({"text": part, "match": i % 2 == 1})
+    return parts
+
+
+def search(conn, text, limit, candidates):
+    """
+    Best matching proposals for `text`, with highlighted title and description
+    snippet. Only the `candidates` newest matches are ranked, so a word found
+    in every proposal costs the same as a rare one.
+    """
+    query = match_query(text)
+    if query is None:
+        return []
+    floor = conn.execute(
+        """
+        SELECT min(rowid) FROM (
+            SELECT rowid FROM proposals_fts WHERE proposals_fts MATCH ? ORDER BY rowid DESC LIMIT ?
+        )
+        """,
+        (query, candidates),
+    ).fetchone()[0]
+    if floor is None:
+        return []
+    rows = conn.execute(
+        f"""
+        SELECT proposals.id, proposals.executed,
+            highlight(proposals_fts, 0, :start, :end) AS title,
+            snippet(proposals_fts, 1, :start, :end, '…', {SNIPPET_TOKENS}) AS snippet,
+            rank
+        FROM proposals_fts JOIN proposals ON proposals.id = proposals_fts.rowid
+        WHERE proposals_fts MATCH :query AND proposals_fts.rowid >= :floor
+        ORDER BY rank
+        LIMIT :limit
+        """,
+        {"start": MATCH_START, "end": MATCH_END, "query": query, "floor": floor, "limit": limit},
+    ).fetchall()
+    return [
+        {
+            "id": row["id"],
+            "executed": bool(row["executed"]),
+            "title": segments(row["title"]),
+            "snippet": segments(row["snippet"]),
+            "rank": row["rank"],
+        }
+        for row in rows
+    ]
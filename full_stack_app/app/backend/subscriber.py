@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from web3 import AsyncWeb3, WebSocketProvider
+from dotenv import load_dotenv
+from .async_integration import get_web3, get_dao_contract, limited, read_proposals, voting_results
+from .integration import proposal_dict, proposal_summary, cache_detail
+from .cache import read_cache
+from .indexer import dao_events
+from .receipts import receipt_tracker
+from .deadlines import deadline_scheduler
+from .proposal_state import ProposalState
+
+load_dotenv()
+
+# Settings
+# Websocket endpoint used for eth_subscribe; block polling is used without it
+WS_RPC_URL = os.getenv("WS_RPC_URL")
+SUBSCRIBER_POLL_INTERVAL = float(os.getenv("SUBSCRIBER_POLL_INTERVAL", "4"))
+# Seconds spent polling before trying the websocket again after it failed
+SUBSCRIBER_WS_RETRY = float(os.getenv("SUBSCRIBER_WS_RETRY", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+async def push_proposal_updates(rx_app, updates, settled=None):
+    """
+    Apply changed proposal entries, and the transactions of each session that
+    got their receipt ({token: {tx hash: succeeded}}), to every connected ProposalState.
+    """
+    if rx_app.event_namespace is None:
+        return
+    settled = settled or {}
+    results = await voting_results(updates) if updates else []
+    for token in list(rx_app.event_namespace.token_to_sid):
+        if not updates and token not in settled:
+            continue
+        try:
+            async with rx_app.modify_state(f"{token}_{ProposalState.get_full_name()}") as state:
+                proposal_state = await state.get_state(ProposalState)
+                # Same update, so a confirmed optimistic change is replaced by the chain values at once
+                proposal_state._settle_transactions(settled.get(token, {}))
+                if updates:
+                    proposal_state._apply_proposal_updates(updates, results)
+        except Exception as e:
+            logger.warning("Failed to push proposal updates to %s: %s", token, e)
+
+
+async def process_blocks(rx_app, from_block, to_block):
+    """
+    Publish the proposals touched by DAO events between `from_block` and
+    `to_block`, and settle the tracked transactions mined by then.
+    """
+    web3 = await get_web3()
+    dao_contract = await get_dao_contract()
+    read_cache.set_head(to_block)
+
+    logs = await limited(web3.eth.get_logs({
+        "address": dao_contract.address,
+        "fromBlock": from_block,
+        "toBlock": to_block,
+        "topics": [[event.topic for event in dao_events(dao_contract)]],
+    }))
+    settled = await receipt_tracker.check(web3, to_block, logs)
+    # proposalId is the first indexed argument of every DAO event
+    ids = sorted({int.from_bytes(log["topics"][1], "big") for log in logs})
+    if not ids and not settled:
+        return
+
+    try:
+        results = await read_proposals(dao_contract, ids, to_block)
+        proposals = [proposal_dict(i, p) for i, p in zip(ids, results)]
+        for proposal in proposals:
+            cache_detail(proposal)
+        summaries = [proposal_summary(p) for p in proposals]
+        deadline_scheduler.schedule(summaries)
+        await push_proposal_updates(rx_app, summaries, settled)
+    except Exception:
+        # These blocks are processed again, and their transactions settled then
+        receipt_tracker.restore(settled)
+        raise
+
+
+async def _poll_blocks(rx_app, cursor, duration=None):
+    web3 = await get_web3()
+    loop = asyncio.get_running_loop()
+    deadline = None if duration is None else loop.time() + duration
+    while deadline is None or loop.time() < deadline:
+        await asyncio.sleep(SUBSCRIBER_POLL_INTERVAL)
+        head = await limited(web3.eth.block_number)
+        if head > cursor["block"]:
+            await process_blocks(rx_app, cursor["block"] + 1, head)
+            cursor["block"] = head
+
+
+async def _watch_websocket(rx_app, cursor):
+    async with AsyncWeb3(WebSocketProvider(WS_RPC_URL)) as ws:
+        await ws.eth.subscribe("newHeads")
+        async for message in ws.socket.process_subscriptions():
+            head = message["result"]["number"]
+            if head > cursor["block"]:
+                await process_blocks(rx_app, cursor["block"] + 1, head)
+                cursor["block"] = head
+
+
+async def run_subscriber(rx_app):
+    """Push live proposal updates to the connected sessions for the whole app lifespan."""
+    # Last block whose events were published
+    cursor = {"block": None}
+    while True:
+        try:
+            if cursor["block"] is None:
+                web3 = await get_web3()
+                cursor["block"] = await limited(web3.eth.block_number)
+            if WS_RPC_URL:
+                await _watch_websocket(rx_app, cursor)
+            else:
+                await _poll_blocks(rx_app, cursor)
+        except Exception as e:
+            logger.exception("Subscriber error: %s", e)
+        if cursor["block"] is None:
+            await asyncio.sleep(SUBSCRIBER_POLL_INTERVAL)
+            continue
+        try:
+            # Fallback while the websocket is down
+            await _poll_blocks(rx_app, cursor, SUBSCRIBER_WS_RETRY)
+        except Exception as e:
+            logger.exception("Subscriber error: %s", e)
@@ -0,0 +1,107 @@
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposal_tallies (
+    proposal_id INTEGER PRIMARY KEY,
+    voters INTEGER NOT NULL DEFAULT 0,
+    for_voters INTEGER NOT NULL DEFAULT 0,
+    against_voters INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS weight_buckets (
+    proposal_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    voters INTEGER NOT NULL DEFAULT 0,
+    weight TEXT NOT NULL DEFAULT '0',
+    PRIMARY KEY (proposal_id, bucket)
+);
+"""
+
+TOKEN_DECIMALS = 18
+
+
+def weight_bucket(weight):
+    """Order of magnitude of a vote in whole tokens: 1 for 1-9 tokens, 2 for 10-99..."""
+    return len(str(max(weight // 10 ** TOKEN_DECIMALS, 1)))
+
+
+def apply_vote(conn, proposal_id, support, weight):
+    """Add one VoteCast to the proposal totals and aggregates, in O(1)."""
+    column = "for_votes" if support else "against_votes"
+    row = conn.execute(f"SELECT {column} FROM proposals WHERE id = ?", (proposal_id,)).fetchone()
+    if row is not None:
+        total = int(row[0]) + weight
+        conn.execute(f"UPDATE proposals SET {column} = ? WHERE id = ?", (str(total), proposal_id))
+
+    side = "for_voters" if support else "against_voters"
+    conn.execute(
+        f"INSERT INTO proposal_tallies (proposal_id, voters, {side}) VALUES (?, 1, 1) "
+        f"ON CONFLICT(proposal_id) DO UPDATE SET voters = voters + 1, {side} = {side} + 1",
+        (proposal_id,),
+    )
+
+    bucket = weight_bucket(weight)
+    row = conn.execute(
+        "SELECT weight FROM weight_buckets WHERE proposal_id = ? AND bucket = ?",
+        (proposal_id, bucket),
+    ).fetchone()
+    conn.execute(
+        "INSERT INTO weight_buckets (proposal_id, bucket, voters, weight) VALUES (?, ?, 1, ?) "
+        "ON CONFLICT(proposal_id, bucket) DO UPDATE SET voters = voters + 1, weight = excluded.weight",
+        (proposal_id, bucket, str(weight + (int(row[0]) if row else 0))),
+    )
+
+
+def backfill(conn):
+    """Build the aggregates of an index created before they existed."""
+    if conn.execute("SELECT 1 FROM proposal_tallies LIMIT 1").fetchone():
+        return
+    votes = conn.execute("SELECT proposal_id, support, weight FROM votes").fetchall()
+    if not votes:
+        return
+    with conn:
+        conn.execute("UPDATE proposals SET for_votes = '0', against_votes = '0'")
+        for proposal_id, support, weight in votes:
+            apply_vote(conn, proposal_id, support, int(weight))
+
+
+def load_tallies(conn, proposal_ids):
+    """Aggregates of the given proposals, keyed by id."""
+    ids = list(proposal_ids)
+    tallies = {
+        proposal_id: {"voters": 0, "forVoters": 0, "againstVoters": 0, "distribution": []}
+        for proposal_id in ids
+    }
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        marks = ",".join("?" * len(chunk))
+        for row in conn.execute(
+            f"SELECT * FROM proposal_tallies WHERE proposal_id IN ({marks})", chunk
+        ):
+            tallies[row[0]].update(voters=row[1], forVoters=row[2], againstVoters=row[3])
+        for row in conn.execute(
+            f"SELECT * FROM weight_buckets WHERE proposal_id IN ({marks}) ORDER BY bucket", chunk
+        ):
+            tallies[row[0]]["distribution"].append({
+                "minTokens": 10 ** (row[1] - 1),
+                "voters": row[2],
+                "weight": int(row[3]),
+            })
+    return tallies
+
+
+def proposal_result(proposal, tally=None, total_supply=0):
+    """Numbers shown in the results section for one proposal."""
+    for_votes = proposal["forVotes"]
+    against_votes = proposal["againstVotes"]
+    total = for_votes + against_votes
+    yes = round(for_votes * 100 / total) if total else 0
+    no = 100 - yes if total else 0
+    turnout = total * 100 / total_supply if total_supply else 0
+    voters = tally["voters"] if tally else 0
+    return {
+        "id": proposal["id"],
+        "title": f"Proposal #{proposal['id']} Results",
+        "progress": f"{yes}%",
+        "yes": f"Yes: {yes}%",
+        "no": f"No: {no}%",
+        "voters": voters,
+        "summary": f"{voters} voters · turnout {turnout:.2f}%",
+    }
@@ -1,16 +1,34 @@
 import reflex as rx
+from .async_integration import voting_power
+from .balances import format_tokens
 
 class WalletState(rx.State):
     address: str = ""
     is_connected: bool = False
+    # Token balance of the connected wallet, which is the weight of its votes
+    voting_power: str = ""
 
     @rx.event(background=True)
     async def set_wallet_address(self, address: str):
         """Set the wallet address and connection status."""
+        # Imported here: proposal_state imports this module
+        from .proposal_state import ProposalState
+
         async with self:
             self.address = address
             self.is_connected = bool(address)
-        yield
+            self.voting_power = ""
+        # The verdicts of the shown proposals depend on the wallet
+        yield ProposalState.refresh_verdicts
+
+        if address:
+            try:
+                power = format_tokens(await voting_power(address))
+            except Exception:
+                return
+            async with self:
+                if self.address == address:
+                    self.voting_power = power
 
     @staticmethod
     def connect_wallet_js():
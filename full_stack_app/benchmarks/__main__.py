@@ -0,0 +1,196 @@
+"""
+Backend benchmarks against a local chain seeded with synthetic DAO histories.
+
+    cd full_stack_app
+    python -m benchmarks --sizes 10,1000 --out bench.json
+    python -m benchmarks --rpc-url http://127.0.0.1:8545 --compare bench.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import types
+import reflex as rx
+from app.backend import async_integration, integration
+from app.backend.cache import read_cache
+from app.backend.nonce import nonce_manager
+from app.backend.proposal_state import ProposalState
+from app.backend.wallet_state import WalletState
+from .chain import connect, deploy, install, seed, seeded_voter
+from .measure import RpcCounter, measure, new_loop
+
+DEFAULT_SIZES = "10,1000,10000,100000"
+# Sessions refreshing at once in the thundering-herd scenario
+HERD_SESSIONS = 50
+# Metrics that count as a regression when they grow past the threshold
+COMPARED_METRICS = ("latency_ms.p50", "latency_ms.p95", "rpc_round_trips", "peak_memory_kb")
+
+
+class LocalSession:
+    """
+    Stand-in for the StateProxy that Reflex hands to background events, so the
+    ProposalState handlers can run without a websocket client.
+    """
+
+    def __init__(self, state):
+        object.__setattr__(self, "_state", state)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    def __getattr__(self, name):
+        value = getattr(self._state, name)
+        if isinstance(value, types.MethodType) and value.__self__ is self._state:
+            # Like StateProxy, helpers called from a handler see the proxy
+            return types.MethodType(value.__func__, self)
+        return value
+
+    def __setattr__(self, name, value):
+        setattr(self._state, name, value)
+
+
+def new_session(address):
+    """ProposalState of a fresh session whose wallet is connected as `address`."""
+    root = rx.State(_reflex_internal_init=True)
+    wallet = root.get_substate(WalletState.get_full_name().split(".")[1:])
+    wallet.address = address
+    wallet.is_connected = True
+    return LocalSession(root.get_substate(ProposalState.get_full_name().split(".")[1:]))
+
+
+def scenarios(sender, proposal_id):
+    """(name, function, setup) of every measured operation."""
+    cold = read_cache.clear
+
+    def built(tx):
+        # The transaction is never sent: give its nonce back
+        nonce_manager.release(tx["from"], tx["nonce"])
+
+    session = new_session(sender)
+    herd = [new_session(sender) for _ in range(HERD_SESSIONS)]
+
+    async def get_proposals_herd():
+        await asyncio.gather(*(ProposalState.get_proposals.fn(s) for s in herd))
+
+    return [
+        ("list_proposals", integration.list_proposals, cold),
+        ("list_proposals.cached", integration.list_proposals, None),
+        ("get_proposal", lambda: integration.get_proposal(proposal_id), cold),
+        ("create_proposal", lambda: built(integration.create_proposal("Title", "Description", 3600, sender)), None),
+        ("vote", lambda: built(integration.vote(proposal_id, True, sender)), None),
+        ("execute_proposal", lambda: built(integration.execute_proposal(proposal_id, sender)), None),
+        ("async.list_proposals", async_integration.list_proposals, cold),
+        ("async.get_proposal", lambda: async_integration.get_proposal(proposal_id), cold),
+        ("async.vote", lambda: _async_built(async_integration.vote(proposal_id, True, sender), built), None),
+        ("ProposalState.get_proposals", lambda: ProposalState.get_proposals.fn(session), cold),
+        ("ProposalState.get_proposals.herd", get_proposals_herd, cold),
+        ("ProposalState.vote_on_proposal", lambda: ProposalState.vote_on_proposal.fn(session, proposal_id, True), None),
+    ]
+
+
+def target_proposal(accounts, sender, size):
+    """A proposal in the middle of the history that `sender` did not vote on while seeding."""
+    return next(i for i in range(max(1, size // 2), 0, -1) if seeded_voter(accounts, i) != sender)
+
+
+async def _async_built(coroutine, built):
+    built(await coroutine)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def metric(result, path):
+    value = result
+    for key in path.split("."):
+        value = value[key]
+    return value
+
+
+def compare(report, baseline, threshold):
+    """Lines describing every metric that got worse than `baseline` by more than `threshold`."""
+    previous = {(r["size"], r["name"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["size"], result["name"]))
+        if before is None:
+            continue
+        for path in COMPARED_METRICS:
+            old, new = metric(before, path), metric(result, path)
+            if old and new > old * (1 + threshold):
+                regressions.append(
+                    f"{result['name']} @ {result['size']}: {path} {old:.2f} -> {new:.2f} (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[1])
+    parser.add_argument("--rpc-url", help="anvil endpoint; an in-process eth-tester chain is used without it")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="proposals (and votes) seeded before each round")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--out", default="bench.json", help="JSON report")
+    parser.add_argument("--compare", help="previous report; exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative growth counted as a regression")
+    args = parser.parse_args(argv)
+
+    web3, async_web3 = connect(args.rpc_url)
+    counter = RpcCounter()
+    counter.wrap(web3.provider)
+    counter.wrap(async_web3.provider)
+    loop = new_loop()
+
+    dao, token = deploy(web3)
+    install(web3, async_web3, dao, token)
+    sender = web3.eth.accounts[1]
+
+    results = []
+    for size in sorted(int(s) for s in args.sizes.split(",")):
+        print(f"Seeding {size} proposals...")
+        seed(web3, dao, size, progress=lambda n: print(f"  {n}/{size}"))
+        for name, fn, setup in scenarios(sender, target_proposal(web3.eth.accounts, sender, size)):
+            result = {"size": size, "name": name, **measure(loop, counter, fn, args.iterations, setup)}
+            results.append(result)
+            print(
+                f"{name:32} {size:>7}  p50 {result['latency_ms']['p50']:9.2f} ms"
+                f"  rpc {result['rpc_round_trips']:8.1f}  mem {result['peak_memory_kb']:9.1f} KiB"
+            )
+
+    loop.run_until_complete(async_integration.close_web3())
+    report = {
+        "meta": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "chain": args.rpc_url or "eth-tester",
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
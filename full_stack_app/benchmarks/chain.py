@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+from web3 import AsyncWeb3, AsyncHTTPProvider, HTTPProvider, Web3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider, EthereumTesterProvider
+from app.backend import async_integration, integration
+from app.backend.abi_cache import artifact_path
+
+# Long enough for every seeded proposal to stay open during the run
+VOTING_PERIOD = 10 * 365 * 24 * 3600
+INITIAL_SUPPLY = 10 ** 6 * 10 ** 18
+# Tokens given to each voting account
+VOTER_TOKENS = 1000 * 10 ** 18
+SEED_GAS = 1000000
+
+
+def connect(rpc_url=None):
+    """Sync and async clients on the same chain: anvil at `rpc_url`, or an in-process eth-tester chain."""
+    if rpc_url:
+        return Web3(HTTPProvider(rpc_url)), AsyncWeb3(AsyncHTTPProvider(rpc_url))
+    provider = EthereumTesterProvider()
+    async_provider = AsyncEthereumTesterProvider()
+    async_provider.ethereum_tester = provider.ethereum_tester
+    return Web3(provider), AsyncWeb3(async_provider)
+
+
+def load_artifact(contract_name):
+    """ABI and creation bytecode from the Forge artifacts (run `forge build` first)."""
+    path = artifact_path(contract_name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Artifact not found at {path}. Run `forge build` in the repository root.")
+    with open(path, "r") as f:
+        artifact = json.load(f)
+    return artifact["abi"], artifact["bytecode"]["object"]
+
+
+def deploy(web3):
+    """Deploy TokenDAO and DAO from the first account and fund the other accounts."""
+    deployer = web3.eth.accounts[0]
+
+    abi, bytecode = load_artifact("TokenDAO.sol")
+    tx_hash = web3.eth.contract(abi=abi, bytecode=bytecode).constructor(INITIAL_SUPPLY).transact({"from": deployer})
+    token = web3.eth.contract(address=web3.eth.wait_for_transaction_receipt(tx_hash).contractAddress, abi=abi)
+
+    abi, bytecode = load_artifact("DAO.sol")
+    tx_hash = web3.eth.contract(abi=abi, bytecode=bytecode).constructor(token.address).transact({"from": deployer})
+    dao = web3.eth.contract(address=web3.eth.wait_for_transaction_receipt(tx_hash).contractAddress, abi=abi)
+
+    for account in web3.eth.accounts[1:]:
+        token.functions.transfer(account, VOTER_TOKENS).transact({"from": deployer, "gas": SEED_GAS})
+    return dao, token
+
+
+def seeded_voter(accounts, proposal_id):
+    """Account that votes on `proposal_id` while seeding."""
+    return accounts[(proposal_id + 1) % len(accounts)]
+
+
+def seed(web3, dao, size, progress=None):
+    """
+    Grow the DAO history to `size` proposals with one vote each. Proposals are
+    created round-robin by every account and voted by the next account.
+    """
+    accounts = web3.eth.accounts
+    last_hash = None
+    start = dao.functions.proposalCount().call()
+    for proposal_id in range(start + 1, size + 1):
+        proposer = accounts[proposal_id % len(accounts)]
+        voter = seeded_voter(accounts, proposal_id)
+        dao.functions.createProposal(
+            f"Proposal {proposal_id}", f"Synthetic proposal number {proposal_id}", VOTING_PERIOD
+        ).transact({"from": proposer, "gas": SEED_GAS})
+        last_hash = dao.functions.castVote(proposal_id, proposal_id % 2 == 0).transact(
+            {"from": voter, "gas": SEED_GAS}
+        )
+        if progress and proposal_id % 1000 == 0:
+            progress(proposal_id)
+    if last_hash is not None:
+        web3.eth.wait_for_transaction_receipt(last_hash, timeout=600)
+
+
+def install(web3, async_web3, dao, token):
+    """Point the backend modules at the benchmark chain instead of RPC_URL/DAO_ADDRESS."""
+    integration._client.clear()
+    integration._client.update(
+        web3=web3,
+        dao_contract=web3.eth.contract(address=dao.address, abi=dao.abi),
+        token_contract=web3.eth.contract(address=token.address, abi=token.abi),
+    )
+    async_integration._client.clear()
+    async_integration._client.update(
+        web3=async_web3,
+        semaphore=asyncio.Semaphore(async_integration.ASYNC_RPC_CONCURRENCY),
+        dao_contract=async_web3.eth.contract(address=dao.address, abi=dao.abi),
+        token_contract=async_web3.eth.contract(address=token.address, abi=token.abi),
+    )
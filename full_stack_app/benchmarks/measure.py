@@ -0,0 +1,104 @@
+import asyncio
+import inspect
+import statistics
+import time
+import tracemalloc
+
+
+class RpcCounter:
+    """Counts the requests a provider sends to the node; a batch counts as one round trip."""
+
+    def __init__(self):
+        self.requests = 0
+        self.round_trips = 0
+
+    def reset(self):
+        self.requests = 0
+        self.round_trips = 0
+
+    def wrap(self, provider):
+        """Count every request of `provider`. Must run before its first request."""
+        make_request = provider.make_request
+        make_batch_request = getattr(provider, "make_batch_request", None)
+
+        if inspect.iscoroutinefunction(make_request):
+            async def counted_request(method, params):
+                self._count(1)
+                return await make_request(method, params)
+
+            async def counted_batch(requests):
+                self._count(len(requests))
+                return await make_batch_request(requests)
+        else:
+            def counted_request(method, params):
+                self._count(1)
+                return make_request(method, params)
+
+            def counted_batch(requests):
+                self._count(len(requests))
+                return make_batch_request(requests)
+
+        provider.make_request = counted_request
+        if make_batch_request is not None:
+            provider.make_batch_request = counted_batch
+
+    def _count(self, requests):
+        self.requests += requests
+        self.round_trips += 1
+
+
+def _run(loop, fn):
+    result = fn()
+    if inspect.isawaitable(result):
+        result = loop.run_until_complete(result)
+    return result
+
+
+def measure(loop, counter, fn, iterations, setup=None):
+    """
+    Latency percentiles and RPC round trips of `fn` (sync or async) over
+    `iterations` runs, plus its peak memory in one extra traced run.
+    """
+    latencies = []
+    requests = []
+    round_trips = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        counter.reset()
+        start = time.perf_counter()
+        _run(loop, fn)
+        latencies.append((time.perf_counter() - start) * 1000)
+        requests.append(counter.requests)
+        round_trips.append(counter.round_trips)
+
+    # tracemalloc slows the code down, so memory is measured apart from latency
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        _run(loop, fn)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "latency_ms": {
+            "min": latencies[0],
+            "p50": statistics.median(latencies),
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "max": latencies[-1],
+            "mean": statistics.fmean(latencies),
+        },
+        "rpc_requests": statistics.fmean(requests),
+        "rpc_round_trips": statistics.fmean(round_trips),
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def new_loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop
@@ -4,15 +4,27 @@ pragma solidity ^0.8.13;
 import {TokenDAO} from "./TokenDAO.sol";
 
 contract DAO {
+    // endTime, proposer and executed share one storage slot (8 + 20 + 1 bytes)
     struct Proposal {
+        uint64 endTime;
+        address proposer;
+        bool executed;
+        uint256 forVotes;
+        uint256 againstVotes;
         string title;
         string description;
+        mapping(address => bool) hasVoted; // To prevent multiple voting
+    }
+
+    // Entry of getProposals: a proposal without its description
+    struct ProposalSummary {
+        uint256 id;
+        string title;
         uint256 endTime;
         uint256 forVotes;
         uint256 againstVotes;
         bool executed;
         address proposer;
-        mapping(address => bool) hasVoted; // To prevent multiple voting
     }
 
     uint256 public proposalCount;
@@ -46,31 +58,31 @@ contract DAO {
         string memory description,
         uint256 votingPeriod
     ) external returns (uint256 proposalId) {
-        require(votingPeriod > 0, "Invalid voting period");
+        require(
+            votingPeriod > 0 &&
+                votingPeriod <= type(uint64).max - block.timestamp,
+            "Invalid voting period"
+        );
         require(token.balanceOf(msg.sender) >= 1 ether, "Insufficient tokens");
 
-        proposalCount++;
+        proposalId = ++proposalCount;
 
         uint256 endTime = block.timestamp + votingPeriod;
 
-        Proposal storage newProposal = proposals[proposalCount];
+        // Votes and executed start at zero: only the non-zero fields are written
+        Proposal storage newProposal = proposals[proposalId];
+        newProposal.endTime = uint64(endTime);
+        newProposal.proposer = msg.sender;
         newProposal.title = title;
         newProposal.description = description;
-        newProposal.endTime = endTime;
-        newProposal.forVotes = 0;
-        newProposal.againstVotes = 0;
-        newProposal.executed = false;
-        newProposal.proposer = msg.sender;
 
         emit ProposalCreated(
-            proposalCount,
+            proposalId,
             title,
             description,
             endTime,
             msg.sender
         );
-
-        return proposalCount;
     }
 
     function castVote(uint256 proposalId, bool support) external {
@@ -82,12 +94,9 @@ contract DAO {
         require(proposal.endTime > block.timestamp, "Voting period has ended");
         require(!proposal.executed, "Proposal already executed");
         require(!proposal.hasVoted[msg.sender], "Already voted");
-        require(
-            token.balanceOf(msg.sender) >= 1 ether,
-            "Insufficient tokens to vote"
-        );
 
         uint256 voterTokens = token.balanceOf(msg.sender);
+        require(voterTokens >= 1 ether, "Insufficient tokens to vote");
 
         proposal.hasVoted[msg.sender] = true;
 
@@ -137,4 +146,36 @@ contract DAO {
             proposal.proposer
         );
     }
+
+    /// Summaries of up to `count` proposals from id `start` on, in id order,
+    /// so a page of proposals is read in a single call.
+    function getProposals(
+        uint256 start,
+        uint256 count
+    ) external view returns (ProposalSummary[] memory summaries) {
+        uint256 total = proposalCount;
+        if (start == 0) {
+            start = 1;
+        }
+        if (start > total) {
+            return new ProposalSummary[](0);
+        }
+        if (count > total - start + 1) {
+            count = total - start + 1;
+        }
+
+        summaries = new ProposalSummary[](count);
+        for (uint256 i = 0; i < count; i++) {
+            Proposal storage proposal = proposals[start + i];
+            summaries[i] = ProposalSummary(
+                start + i,
+                proposal.title,
+                proposal.endTime,
+                proposal.forVotes,
+                proposal.againstVotes,
+                proposal.executed,
+                proposal.proposer
+            );
+        }
+    }
 }
@@ -0,0 +1,64 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.13;
+
+import {Test, console} from "../lib/forge-std/src/Test.sol";
+import {DAO} from "../src/DAO.sol";
+import {TokenDAO} from "../src/TokenDAO.sol";
+import {DeployDAO} from "../script/DeployMyDAO.s.sol";
+
+// Gas benchmark of the DAO operations. Run `forge snapshot` to record the
+// gas of each test in .gas-snapshot, and `forge snapshot --diff` to compare
+// a change against it.
+contract DAOGasTest is Test {
+    DAO dao;
+    TokenDAO token;
+
+    address public USER = makeAddr("user");
+    uint256 public constant AIRDROP = 10 ether;
+    // Size of a page of the proposal list in the app
+    uint256 public constant PAGE_SIZE = 20;
+
+    function setUp() public {
+        DeployDAO deployDAO = new DeployDAO();
+        (token, dao) = deployDAO.run();
+
+        token.transfer(USER, AIRDROP);
+
+        for (uint256 i = 0; i < PAGE_SIZE; i++) {
+            dao.createProposal("Benchmark proposal", "Benchmark description", 1 days);
+        }
+    }
+
+    function testGasCreateProposal() public {
+        dao.createProposal("Title", "Description", 1 days);
+    }
+
+    function testGasCastVote() public {
+        vm.prank(USER);
+        dao.castVote(1, true);
+    }
+
+    function testGasExecuteProposal() public {
+        dao.executeProposal(1);
+    }
+
+    function testGasGetProposal() public view {
+        dao.getProposal(1);
+    }
+
+    function testGasPageWithGetProposal() public view {
+        uint256 gasStart = gasleft();
+        for (uint256 i = 1; i <= PAGE_SIZE; i++) {
+            dao.getProposal(i);
+        }
+        console.log("Page of getProposal calls:", gasStart - gasleft());
+    }
+
+    function testGasPageWithGetProposals() public view {
+        uint256 gasStart = gasleft();
+        DAO.ProposalSummary[] memory summaries = dao.getProposals(1, PAGE_SIZE);
+        console.log("Page of getProposals:", gasStart - gasleft());
+
+        assertEq(summaries.length, PAGE_SIZE, "Should return a full page");
+    }
+}
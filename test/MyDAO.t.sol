@@ -331,4 +331,70 @@ contract DAOTest is Test {
     }
 
     /* ------- ENDING EXECUTE PROPOSAL TESTS ------- */
+
+    /* ------- BEGINNING GET PROPOSALS TESTS ------- */
+
+    function testGetProposalsReturnsSummariesInIdOrder() public {
+        dao.createProposal("First", "First description", 1 days);
+        vm.prank(USER);
+        dao.createProposal("Second", "Second description", 2 days);
+
+        vm.prank(USER2);
+        dao.castVote(2, false);
+
+        DAO.ProposalSummary[] memory summaries = dao.getProposals(1, 2);
+
+        assertEq(summaries.length, 2, "Should return both proposals");
+        assertEq(summaries[0].id, 1, "First id is incorrect");
+        assertEq(summaries[0].title, "First", "First title is incorrect");
+        assertEq(summaries[1].id, 2, "Second id is incorrect");
+        assertEq(summaries[1].endTime, block.timestamp + 2 days, "endTime is incorrect");
+        assertEq(summaries[1].againstVotes, 2 * AIRDROP, "Against votes are incorrect");
+        assertEq(summaries[1].proposer, USER, "Proposer address is incorrect");
+    }
+
+    function testGetProposalsMatchesGetProposal() public {
+        uint256 proposalId = dao.createProposal("Title", "Description", 1 days);
+        vm.prank(USER);
+        dao.castVote(proposalId, true);
+        dao.executeProposal(proposalId);
+
+        (
+            string memory title,
+            ,
+            uint256 endTime,
+            uint256 forVotes,
+            uint256 againstVotes,
+            bool executed,
+            address proposer
+        ) = dao.getProposal(proposalId);
+        DAO.ProposalSummary memory summary = dao.getProposals(proposalId, 1)[0];
+
+        assertEq(summary.title, title, "Title does not match");
+        assertEq(summary.endTime, endTime, "endTime does not match");
+        assertEq(summary.forVotes, forVotes, "For votes do not match");
+        assertEq(summary.againstVotes, againstVotes, "Against votes do not match");
+        assertEq(summary.executed, executed, "Executed does not match");
+        assertEq(summary.proposer, proposer, "Proposer does not match");
+    }
+
+    function testGetProposalsClampsToProposalCount() public {
+        dao.createProposal("First", "Description", 1 days);
+        dao.createProposal("Second", "Description", 1 days);
+        dao.createProposal("Third", "Description", 1 days);
+
+        DAO.ProposalSummary[] memory summaries = dao.getProposals(2, 10);
+        assertEq(summaries.length, 2, "Should stop at the last proposal");
+        assertEq(summaries[1].id, 3, "Last id is incorrect");
+
+        assertEq(dao.getProposals(4, 10).length, 0, "Should be empty past the last proposal");
+        assertEq(dao.getProposals(0, 1)[0].id, 1, "Start 0 should read from the first proposal");
+    }
+
+    function testCantCreateProposalWithVotingPeriodPastUint64() public {
+        vm.expectRevert("Invalid voting period");
+        dao.createProposal("Title", "Description", type(uint64).max);
+    }
+
+    /* ------- ENDING GET PROPOSALS TESTS ------- */
 }